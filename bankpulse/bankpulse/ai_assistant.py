@@ -88,18 +88,12 @@ class AIAssistant:
             asset_class = 'commercial_industrial'
         
         # Get filtered data
-        data = self.db_manager.get_data(start_date=start_date)
-        
-        if data.empty:
-            return "No data available for the specified criteria."
-        
-        # Filter by bank type if specified
-        if bank_type:
-            data = data[data['bank_type'] == bank_type]
-        
-        # Filter by asset class if specified
-        if asset_class:
-            data = data[data['asset_class'] == asset_class]
+        data = self.db_manager.get_data(
+            start_date=start_date,
+            bank_type=bank_type,
+            asset_class=asset_class,
+            columns=['series_name', 'date', 'value']
+        )
         
         if data.empty:
             return f"No data available for {bank_type or 'all'} banks and {asset_class or 'all asset classes'}."
@@ -2,29 +2,80 @@
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from typing import Dict, List, Tuple, Optional
 
-from .database import DatabaseManager
+from .config import ANOMALY_WINDOW, GROWTH_CUSTOM_LAGS
+from .database import DatabaseManager, FLLI_COLUMNS
+from .store import SeriesStore
+from .clustering import ClusterEngine
+from .metrics import timed_stage
+
+# Growth-rate lags in weeks and the prefix of their *_change columns
+GROWTH_LAGS = {1: 'wow', 4: 'mom', 52: 'yoy'}
+GROWTH_LAGS.update({lag: f'lag_{lag}w' for lag in GROWTH_CUSTOM_LAGS if lag not in GROWTH_LAGS})
+
+LOAN_ASSET_CLASSES = ['commercial_industrial', 'real_estate', 'consumer']
+FLLI_ASSET_CLASSES = LOAN_ASSET_CLASSES + ['deposits', 'reserves']
+
+# FLLI: each component is computed per series over the trailing weeks, then level-weighted
+FLLI_WINDOW = 12
+# Only weekly series feed the FLLI; series whose observations are further apart on
+# average (monthly, quarterly) never fill a weekly window
+FLLI_MAX_SPACING_DAYS = 10
+# Fixed origin for the reserve trend's time axis, so slopes do not depend on the rows loaded
+FLLI_TIME_ORIGIN = pd.Timestamp('2000-01-01')
+FLLI_WEIGHTS = {'loan_momentum': 0.5, 'deposit_volatility': -0.3, 'reserve_trend': 0.2}
+FLLI_COMPONENT_CLASSES = {
+    'loan_momentum': LOAN_ASSET_CLASSES,
+    'deposit_volatility': ['deposits'],
+    'reserve_trend': ['reserves'],
+}
+
+ANOMALY_METHODS = ['zscore', 'rolling', 'robust', 'yoy', 'ewma']
+# Methods whose scores only depend on earlier observations can be persisted and
+# extended incrementally as new weeks arrive
+PERSISTED_ANOMALY_METHODS = ['rolling', 'yoy', 'ewma']
+YOY_LAG = 52
+# Scales MAD to be comparable with a standard deviation under normality
+MAD_SCALE = 0.6745
 
 
 class CreditAnalytics:
     """Advanced analytics for credit conditions"""
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, store: Optional[SeriesStore] = None):
         self.db_manager = db_manager
+        # Reads go through the in-memory store when one is provided
+        self.data_source = store or db_manager
+        self.cluster_engine = ClusterEngine(db_manager, self.data_source)
+        db_manager.add_update_listener(self.on_data_update)
     
-    def calculate_growth_rates(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculate YoY, MoM, and WoW growth rates"""
+    def on_data_update(self, changes: Dict[str, str]):
+        """Refresh derived analytics for the series written by a data load"""
+        if changes:
+            self.update_growth_rates(changes)
+            self.update_anomalies(changes)
+            self.update_flli(changes)
+    
+    def rebuild_derived(self):
+        """Recompute all derived analytics tables from the full history"""
+        series = self.db_manager.get_series()
+        changes = dict(zip(series['series_code'], series['first_date']))
+        self.db_manager.clear_derived()
+        # Recorded as a load of every series: listeners (this one included) recompute
+        # the derived tables, and the new data version invalidates cached responses
+        self.db_manager.record_update(0, 'success', changes=changes)
+    
+    @timed_stage('calculate_growth_rates')
+    def calculate_growth_rates(self, df: pd.DataFrame, key: str = 'series_name') -> pd.DataFrame:
+        """Calculate YoY, MoM, and WoW growth rates (plus configured custom lags)"""
         df = df.sort_values('date')
-        df['value_lag_1w'] = df.groupby('series_name')['value'].shift(1)
-        df['value_lag_4w'] = df.groupby('series_name')['value'].shift(4)
-        df['value_lag_52w'] = df.groupby('series_name')['value'].shift(52)
+        for lag in GROWTH_LAGS:
+            df[f'value_lag_{lag}w'] = df.groupby(key)['value'].shift(lag)
         
-        df['wow_change'] = ((df['value'] - df['value_lag_1w']) / df['value_lag_1w'] * 100)
-        df['mom_change'] = ((df['value'] - df['value_lag_4w']) / df['value_lag_4w'] * 100)
-        df['yoy_change'] = ((df['value'] - df['value_lag_52w']) / df['value_lag_52w'] * 100)
+        for lag, name in GROWTH_LAGS.items():
+            lagged = df[f'value_lag_{lag}w']
+            df[f'{name}_change'] = ((df['value'] - lagged) / lagged * 100)
         
         # Replace inf and -inf with None, and fill NaN with None
         df = df.replace([np.inf, -np.inf], None)
@@ -32,139 +83,360 @@ class CreditAnalytics:
         
         return df
     
-    def detect_anomalies(self, df: pd.DataFrame, threshold: float = 2.5) -> pd.DataFrame:
-        """Detect anomalies using z-score method"""
+    @timed_stage('detect_anomalies')
+    def detect_anomalies(self, df: pd.DataFrame, threshold: float = 2.5,
+                         method: str = 'zscore', window: int = 52) -> pd.DataFrame:
+        """Detect anomalies using per-series z-scores (global, rolling, median/MAD, YoY residual or EWMA)"""
+        if method not in ANOMALY_METHODS:
+            raise ValueError(f"Unknown anomaly method '{method}'")
+        
         df = df.copy()
+        if df.empty:
+            df['z_score'] = pd.Series(dtype=float)
+            df['is_anomaly'] = pd.Series(dtype=bool)
+            return df
         
-        for series in df['series_name'].unique():
-            series_data = df[df['series_name'] == series]['value']
-            mean = series_data.mean()
-            std = series_data.std()
-            
-            z_scores = np.abs((series_data - mean) / std)
-            df.loc[df['series_name'] == series, 'z_score'] = z_scores
-            df.loc[df['series_name'] == series, 'is_anomaly'] = z_scores > threshold
+        # Descriptions may repeat across series, so group on the code when it is available
+        key = 'series_code' if 'series_code' in df.columns else 'series_name'
+        values = df['value'].astype(float)
+        groups = values.groupby(df[key], sort=False)
+        
+        if method == 'zscore':
+            z_scores = (values - groups.transform('mean')) / groups.transform('std')
+        elif method == 'robust':
+            median = groups.transform('median')
+            deviation = (values - median).abs()
+            mad = deviation.groupby(df[key], sort=False).transform('median')
+            z_scores = MAD_SCALE * (values - median) / mad
+        elif method == 'rolling':
+            z_scores = self._rolling_z_scores(df, window, key)
+        elif method == 'yoy':
+            z_scores = self._yoy_z_scores(df, window, key)
+        else:
+            ordered = df.sort_values([key, 'date'], kind='stable')
+            z_scores, _ = self._ewma_z_scores(ordered, window, key=key)
+            z_scores = z_scores.reindex(df.index)
         
+        df['z_score'] = z_scores.abs()
+        df['is_anomaly'] = df['z_score'] > threshold
         return df
     
-    def calculate_flli(self, start_date: str = None, end_date: str = None) -> Dict:
-        """Calculate Forward-Looking Lending Index (FLLI)"""
-        # Get relevant data
-        loan_data = self.db_manager.get_data(start_date=start_date, end_date=end_date)
+    def _rolling_z_scores(self, df: pd.DataFrame, window: int, key: str = 'series_name') -> pd.Series:
+        """Z-score of each observation against the preceding window of its series"""
+        ordered = df[[key, 'date', 'value']].sort_values([key, 'date'], kind='stable')
+        rolling = ordered.groupby(key, sort=False)['value'].rolling(
+            window, min_periods=max(2, window // 4)
+        )
+        # Shift by one within each series so the current point is not in its own baseline
+        mean = rolling.mean().reset_index(level=0, drop=True)
+        std = rolling.std().reset_index(level=0, drop=True)
+        baseline = pd.DataFrame({'mean': mean, 'std': std}).groupby(ordered[key], sort=False).shift(1)
+        z_scores = (ordered['value'] - baseline['mean']) / baseline['std']
+        return z_scores.reindex(df.index)
+    
+    def _yoy_z_scores(self, df: pd.DataFrame, window: int, key: str = 'series_name') -> pd.Series:
+        """Rolling z-score of year-over-year growth, so long-run trends are not flagged"""
+        ordered = df[[key, 'date', 'value']].sort_values([key, 'date'], kind='stable')
+        lagged = ordered.groupby(key, sort=False)['value'].shift(YOY_LAG)
+        ordered['value'] = ordered['value'] / lagged - 1
+        return self._rolling_z_scores(ordered, window, key).reindex(df.index)
+    
+    def _ewma_z_scores(self, ordered: pd.DataFrame, window: int, key: str = 'series_name',
+                       state: Optional[Dict[str, Dict]] = None) -> Tuple[pd.Series, Dict[str, Dict]]:
+        """EWMA z-scores for rows sorted by (key, date), optionally resuming from saved state"""
+        alpha = 2.0 / (window + 1)
+        min_periods = max(2, window // 4)
+        state = {k: v for k, v in (state or {}).items() if v.get('mean') is not None}
         
-        if loan_data.empty:
-            return {'flli_score': 0, 'status': 'no_data'}
+        values = ordered['value'].to_numpy(dtype=np.float64)
+        frame = pd.DataFrame({
+            key: ordered[key].to_numpy(),
+            'date': ordered['date'].to_numpy(),
+            'x': values,
+            'x2': values * values,
+            'row': np.arange(len(ordered)),
+        })
+        seeded = frame[key].isin(list(state))
+        if seeded.any():
+            # A seed row carrying the saved EWMA moments restarts the recursion exactly
+            codes = frame.loc[seeded, key].unique()
+            seeds = pd.DataFrame({
+                key: codes,
+                'date': None,
+                'x': [state[c]['mean'] for c in codes],
+                'x2': [state[c]['mean_sq'] for c in codes],
+                'row': -1,
+            })
+            frame = pd.concat([seeds, frame], ignore_index=True)
+            frame = frame.sort_values([key, 'row'], kind='stable', ignore_index=True)
         
-        # Filter for key indicators
-        loan_growth = loan_data[loan_data['asset_class'].isin(['commercial_industrial', 'real_estate', 'consumer'])]
-        deposits = loan_data[loan_data['asset_class'] == 'deposits']
-        reserves = loan_data[loan_data['asset_class'] == 'reserves']
+        groups = frame.groupby(key, sort=False)
+        moments = groups[['x', 'x2']].ewm(alpha=alpha, adjust=False).mean().reset_index(level=0, drop=True)
+        previous = moments.groupby(frame[key], sort=False).shift(1)
         
-        # Calculate components
-        loan_momentum = self._calculate_momentum(loan_growth)
-        deposit_volatility = self._calculate_volatility(deposits)
-        reserve_trend = self._calculate_trend(reserves)
+        # Observations seen before each row, including those folded into the seed
+        seed_counts = frame[key].map({k: v['count'] for k, v in state.items()}).fillna(0)
+        count_before = groups.cumcount() + seed_counts - frame[key].isin(list(state)).astype(int)
         
-        # Combine into FLLI score (-100 to +100)
-        flli_score = (loan_momentum * 0.5 - deposit_volatility * 0.3 + reserve_trend * 0.2) * 100
-        flli_score = max(-100, min(100, flli_score))
+        variance = (previous['x2'] - previous['x'] ** 2).clip(lower=0)
+        z_scores = (frame['x'] - previous['x']) / np.sqrt(variance)
+        z_scores[count_before < min_periods] = np.nan
         
-        return {
-            'flli_score': round(flli_score, 2),
-            'loan_momentum': round(loan_momentum, 3),
-            'deposit_volatility': round(deposit_volatility, 3),
-            'reserve_trend': round(reserve_trend, 3),
-            'status': 'calculated'
+        real = frame['row'] >= 0
+        result = pd.Series(z_scores[real].to_numpy(),
+                           index=ordered.index[frame.loc[real, 'row'].to_numpy()])
+        
+        last = frame.assign(count=count_before + 1, mean=moments['x'], mean_sq=moments['x2'])
+        last = last[real].groupby(key, sort=False).tail(1)
+        new_state = {
+            row[key]: {'last_date': row['date'], 'mean': row['mean'],
+                       'mean_sq': row['mean_sq'], 'count': int(row['count'])}
+            for _, row in last.iterrows()
         }
+        return result, new_state
     
-    def _calculate_momentum(self, df: pd.DataFrame) -> float:
-        """Calculate loan growth momentum"""
-        if df.empty:
-            return 0.0
-        
-        df = df.sort_values('date')
-        recent_values = df.tail(12)['value'].values
+    @timed_stage('update_growth_rates')
+    def update_growth_rates(self, changes: Dict[str, str]):
+        """Materialize growth rates for the tail of each series written by a load"""
+        covered = self.db_manager.get_growth_rate_series()
         
-        if len(recent_values) < 2:
-            return 0.0
+        # Series never materialized get their full history; others only the changed tail
+        full = [code for code in changes if code not in covered]
+        partial = [code for code in changes if code in covered]
+        frames = []
+        if full:
+            frames.append(self.data_source.get_data(series_code=full, columns=['series_code', 'date', 'value']))
+        if partial:
+            # Lags count observations, so look back that many rows whatever the frequency
+            frames.append(self.db_manager.get_tails({code: changes[code] for code in partial},
+                                                    max(GROWTH_LAGS),
+                                                    columns=['series_code', 'date', 'value']))
         
-        # Simple momentum: (recent avg - older avg) / older avg
-        mid_point = len(recent_values) // 2
-        recent_avg = np.mean(recent_values[mid_point:])
-        older_avg = np.mean(recent_values[:mid_point])
+        data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if data.empty:
+            return
         
-        if older_avg == 0:
-            return 0.0
+        data = data.sort_values(['series_code', 'date'], kind='stable', ignore_index=True)
+        for lag in GROWTH_LAGS:
+            lagged = data.groupby('series_code', sort=False)['value'].shift(lag)
+            data[f'value_lag_{lag}w'] = lagged
+            data[f'change_{lag}w'] = ((data['value'] - lagged) / lagged * 100).replace([np.inf, -np.inf], np.nan)
         
-        return (recent_avg - older_avg) / older_avg
+        # Only rows from each changed date on are rewritten; new series are written in full
+        since = {code: changes[code] for code in partial}
+        rewrite = data['date'] >= data['series_code'].map(since).fillna('')
+        self.db_manager.save_growth_rates(data[rewrite], list(GROWTH_LAGS), since=since)
     
-    def _calculate_volatility(self, df: pd.DataFrame) -> float:
-        """Calculate deposit volatility"""
-        if df.empty:
-            return 0.0
+    @timed_stage('update_anomalies')
+    def update_anomalies(self, changes: Dict[str, str], window: int = ANOMALY_WINDOW):
+        """Score observations written by a load and persist anomalies for incremental methods"""
+        for method in PERSISTED_ANOMALY_METHODS:
+            state = self.db_manager.get_anomaly_state(method, window)
+            
+            # Series with saved state only need rescoring from their change date;
+            # EWMA can additionally resume from its saved moments if nothing older changed
+            resume = {code: state[code] for code in changes if code in state
+                      and (method != 'ewma' or state[code]['last_date'] < changes[code])}
+            persist_from = {code: changes[code] if code in resume else None for code in changes}
+            
+            frames = []
+            fresh = [code for code in changes if code not in resume]
+            if fresh:
+                frames.append(self.data_source.get_data(series_code=fresh))
+            if resume:
+                if method == 'ewma':
+                    start = min(s['last_date'] for s in resume.values())
+                    tail = self.data_source.get_data(series_code=list(resume), start_date=start)
+                    # Drop rows already folded into each series' saved moments
+                    done = tail['series_code'].map({c: s['last_date'] for c, s in resume.items()})
+                    tail = tail[tail['date'] > done]
+                else:
+                    # Lookback in observations, so the first changed row gets its full
+                    # baseline window (and year-ago values) whatever the series' frequency
+                    lookback = window + (YOY_LAG if method == 'yoy' else 0)
+                    tail = self.db_manager.get_tails({code: changes[code] for code in resume}, lookback)
+                frames.append(tail)
+            
+            data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            if data.empty:
+                continue
+            data = data.sort_values(['series_code', 'date'], kind='stable', ignore_index=True)
+            
+            if method == 'ewma':
+                z_scores, new_state = self._ewma_z_scores(data, window, key='series_code', state=resume)
+                data['z_score'] = z_scores.abs()
+            else:
+                data = self.detect_anomalies(data, method=method, window=window)
+                last = data.groupby('series_code', sort=False).tail(1)
+                new_state = {row['series_code']: {'last_date': row['date']}
+                             for _, row in last.iterrows()}
+            
+            since = data['series_code'].map(persist_from).fillna('')
+            scored = data.loc[data['date'] >= since, ['series_code', 'date', 'z_score']]
+            self.db_manager.save_anomalies(method, window, persist_from, scored, new_state)
+    
+    @timed_stage('calculate_flli')
+    def calculate_flli(self, start_date: str = None, end_date: str = None) -> Dict:
+        """Calculate Forward-Looking Lending Index (FLLI)"""
+        # Without a start date the score only depends on history up to end_date,
+        # which is exactly what the materialized weekly series holds
+        if not start_date:
+            latest = self.db_manager.get_flli_history(end_date=end_date, latest=True)
+            if not latest.empty:
+                return self._flli_result(latest.iloc[0])
         
-        df = df.sort_values('date')
-        recent_values = df.tail(12)['value'].values
+        # Get relevant data
+        loan_data = self._flli_data(start_date, end_date)
         
-        if len(recent_values) < 2:
-            return 0.0
+        if loan_data.empty:
+            return {'flli_score': 0, 'status': 'no_data'}
         
-        return np.std(recent_values) / np.mean(recent_values) if np.mean(recent_values) != 0 else 0.0
-    
-    def _calculate_trend(self, df: pd.DataFrame) -> float:
-        """Calculate reserve trend"""
-        if df.empty:
-            return 0.0
+        # Short ranges use every week they have, down to two
+        weeks = loan_data['date'].nunique()
+        if weeks < 2:
+            components = {name: 0.0 for name in FLLI_WEIGHTS}
+            components.update(date=loan_data['date'].max(), flli_score=0.0)
+            return self._flli_result(components)
         
-        df = df.sort_values('date')
-        recent_values = df.tail(12)['value'].values
+        history = self.compute_flli_history(loan_data, window=min(FLLI_WINDOW, weeks))
+        if history.empty:
+            # No week in the range has a full window for any component
+            return {'flli_score': 0, 'status': 'no_data'}
+        return self._flli_result(history.iloc[-1])
+    
+    @timed_stage('compute_flli_history')
+    def compute_flli_history(self, data: pd.DataFrame, window: int = FLLI_WINDOW) -> pd.DataFrame:
+        """FLLI for every week with a full window, from per-series components of weekly series
         
-        if len(recent_values) < 2:
-            return 0.0
+        Windows span window weeks of calendar time, so a series missing a week simply
+        drops out of that window instead of misaligning every other series.
+        """
+        levels, component_of = self._flli_inputs(data)
+        calculators = {
+            'loan_momentum': self._calculate_momentum,
+            'deposit_volatility': self._calculate_volatility,
+            'reserve_trend': self._calculate_trend,
+        }
         
-        # Linear trend
-        x = np.arange(len(recent_values))
-        slope = np.polyfit(x, recent_values, 1)[0]
+        components = {}
+        for component, calculate in calculators.items():
+            series_levels = levels.loc[:, component_of == component]
+            if series_levels.empty:
+                # Missing indicators contribute 0
+                continue
+            per_series = calculate(series_levels, window)
+            
+            # Level-weighted mean across series, so each series' statistic is scale-free
+            # but larger books count for more
+            weights = self._flli_rolling(series_levels, window).mean().abs().where(per_series.notna())
+            components[component] = (per_series * weights).sum(axis=1, min_count=1) / weights.sum(axis=1)
         
-        return slope / np.mean(recent_values) if np.mean(recent_values) != 0 else 0.0
+        history = pd.DataFrame(components, index=levels.index).dropna()
+        history = history.reindex(columns=FLLI_COLUMNS[1:], fill_value=0.0)
+        history.insert(0, 'flli_score', self._flli_score(history))
+        history.index = history.index.strftime('%Y-%m-%d')
+        return history.rename_axis('date').reset_index()
     
-    def cluster_banks(self, n_clusters: int = 3) -> Dict:
-        """Cluster banks by lending behavior"""
-        data = self.db_manager.get_data()
+    @timed_stage('flli_history')
+    def flli_history(self, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """Weekly FLLI series, read from the materialized table when available"""
+        if not self.db_manager.get_flli_history(latest=True).empty:
+            return self.db_manager.get_flli_history(start_date, end_date)
         
-        if data.empty:
-            return {'status': 'no_data', 'clusters': []}
-        
-        # Pivot data for clustering
-        pivot_data = data.pivot_table(
-            index='series_name',
-            columns='date',
-            values='value',
-            aggfunc='mean'
-        ).fillna(0)
-        
-        if len(pivot_data) < n_clusters:
-            return {'status': 'insufficient_data', 'clusters': []}
-        
-        # Standardize and cluster
-        scaler = StandardScaler()
-        scaled_data = scaler.fit_transform(pivot_data)
-        
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(scaled_data)
-        
-        # Organize results
-        cluster_results = []
-        for i in range(n_clusters):
-            cluster_series = pivot_data.index[clusters == i].tolist()
-            cluster_results.append({
-                'cluster_id': i,
-                'series_count': len(cluster_series),
-                'series_names': cluster_series[:10]  # Limit to first 10
-            })
+        # Not materialized yet (database loaded before the FLLI table existed)
+        data = self._flli_data(end_date=end_date)
+        history = self.compute_flli_history(data)
+        if start_date:
+            history = history[history['date'] >= start_date].reset_index(drop=True)
+        return history
+    
+    @timed_stage('update_flli')
+    def update_flli(self, changes: Dict[str, str]):
+        """Recompute the materialized FLLI from the earliest changed week onwards"""
+        since = None
+        if not self.db_manager.get_flli_history(latest=True).empty:
+            since = min(changes.values())
         
+        # One window of lookback is enough for the first recomputed week
+        start = None
+        if since:
+            start = (pd.Timestamp(since) - pd.Timedelta(weeks=FLLI_WINDOW + 1)).strftime('%Y-%m-%d')
+        history = self.compute_flli_history(self._flli_data(start_date=start))
+        if since:
+            history = history[history['date'] >= since]
+        self.db_manager.save_flli_history(history, since)
+    
+    def _flli_data(self, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """Observations of the weekly series feeding the FLLI"""
+        series = self.data_source.get_series(asset_class=FLLI_ASSET_CLASSES)
+        spacing = ((pd.to_datetime(series['last_date']) - pd.to_datetime(series['first_date'])).dt.days
+                   / (series['observations'] - 1))
+        weekly = series.loc[spacing <= FLLI_MAX_SPACING_DAYS, 'series_code'].tolist()
+        return self.data_source.get_data(start_date=start_date, end_date=end_date,
+                                         series_code=weekly, asset_class=FLLI_ASSET_CLASSES,
+                                         columns=['series_code', 'date', 'value', 'asset_class'])
+    
+    def _flli_inputs(self, data: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+        """Date x series level matrix and the FLLI component each series feeds"""
+        levels = data.pivot_table(index='date', columns='series_code', values='value',
+                                  aggfunc='mean').sort_index()
+        levels.index = pd.to_datetime(levels.index)
+        component_of = {asset_class: component for component, classes in FLLI_COMPONENT_CLASSES.items()
+                        for asset_class in classes}
+        classes = data.drop_duplicates('series_code').set_index('series_code')['asset_class']
+        return levels, classes.reindex(levels.columns).map(component_of)
+    
+    def _flli_score(self, components) -> float:
+        """Combine into FLLI score (-100 to +100)"""
+        score = sum(components[name] * weight for name, weight in FLLI_WEIGHTS.items()) * 100
+        return np.clip(score, -100, 100)
+    
+    def _flli_result(self, row) -> Dict:
         return {
-            'status': 'success',
-            'n_clusters': n_clusters,
-            'clusters': cluster_results
+            'flli_score': round(float(row['flli_score']), 2),
+            'loan_momentum': round(float(row['loan_momentum']), 3),
+            'deposit_volatility': round(float(row['deposit_volatility']), 3),
+            'reserve_trend': round(float(row['reserve_trend']), 3),
+            'date': row['date'],
+            'status': 'calculated'
         }
+    
+    def _flli_rolling(self, levels: pd.DataFrame, weeks: int, min_periods: int = None):
+        """Trailing window of calendar weeks, by default requiring one observation per week"""
+        min_periods = weeks if min_periods is None else min_periods
+        return levels.rolling(pd.Timedelta(weeks=weeks), min_periods=min_periods)
+    
+    def _calculate_momentum(self, levels: pd.DataFrame, window: int) -> pd.DataFrame:
+        """Per-series loan growth momentum: (recent avg - older avg) / older avg"""
+        # The older part of the window is the full window minus its recent weeks
+        recent_weeks = window - window // 2
+        full = self._flli_rolling(levels, window)
+        recent = self._flli_rolling(levels, recent_weeks, min_periods=1)
+        older_sum = full.sum() - recent.sum()
+        older = older_sum / (full.count() - recent.count())
+        recent = recent.mean()
+        return ((recent - older) / older).where(older != 0, 0.0).where(older.notna())
+    
+    def _calculate_volatility(self, levels: pd.DataFrame, window: int) -> pd.DataFrame:
+        """Per-series deposit volatility (coefficient of variation)"""
+        rolling = self._flli_rolling(levels, window)
+        mean = rolling.mean()
+        return (rolling.std(ddof=0) / mean).where(mean != 0, 0.0).where(mean.notna())
+    
+    def _calculate_trend(self, levels: pd.DataFrame, window: int) -> pd.DataFrame:
+        """Per-series reserve trend: least-squares slope per week over the window relative to its mean"""
+        # Closed-form slope from rolling sums of t, t^2, y and t*y over each series' own dates
+        t = ((levels.index - FLLI_TIME_ORIGIN).days / 7).to_numpy(dtype=np.float64)
+        times = levels.notna().mul(t, axis=0).where(levels.notna())
+        n = self._flli_rolling(levels, window).count()
+        sum_y = self._flli_rolling(levels, window).sum()
+        sum_t = self._flli_rolling(times, window).sum()
+        sum_tt = self._flli_rolling(times * times, window).sum()
+        sum_ty = self._flli_rolling(levels * times, window).sum()
+        slope = (n * sum_ty - sum_t * sum_y) / (n * sum_tt - sum_t ** 2)
+        mean = sum_y / n
+        return (slope / mean).where(mean != 0, 0.0).where(mean.notna())
+    
+    def cluster_banks(self, n_clusters: int = 3) -> Dict:
+        """Cluster banks by lending behavior"""
+        return self.cluster_engine.cluster(n_clusters)
@@ -1,9 +1,9 @@
 """FastAPI application for BankPulse"""
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from typing import Optional, List
 from datetime import datetime
 from pathlib import Path
@@ -11,14 +11,24 @@ import pandas as pd
 
 from .database import DatabaseManager
 from .data_loader import H8DataLoader
-from .analytics import CreditAnalytics
+from .analytics import CreditAnalytics, PERSISTED_ANOMALY_METHODS, GROWTH_LAGS
+from .clustering import fit_clusters
+from .config import ANOMALY_WINDOW
+from .concurrency import blocking, run_cpu, shutdown_pools
+from .jobs import JobManager
+from .cache import ResponseCache, CACHED_PATHS, CACHED_HEADERS, etag_matches
+from .store import SeriesStore
+from .responses import (FastJSONResponse, FORMAT_PATTERN, check_format, check_dates, frame_response,
+                        ndjson_stream, encode_cursor, decode_cursor)
+from .metrics import REGISTRY, DATA_VERSION, CONTENT_TYPE, MetricsMiddleware, timed_stage
 from .ai_assistant import AIAssistant
 
 # Initialize FastAPI app
 app = FastAPI(
     title="BankPulse API",
     description="Interactive Credit Conditions Explorer for U.S. Commercial Banking Activity",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=FastJSONResponse
 )
 
 # Mount static files
@@ -38,14 +48,55 @@ app.add_middleware(
 # Initialize components
 db_manager = DatabaseManager()
 data_loader = H8DataLoader(db_manager)
-analytics = CreditAnalytics(db_manager)
+series_store = SeriesStore(db_manager)
+analytics = CreditAnalytics(db_manager, store=series_store)
 ai_assistant = AIAssistant(db_manager)
+download_jobs = JobManager()
+response_cache = ResponseCache()
+
+
+@app.middleware("http")
+async def response_cache_middleware(request: Request, call_next):
+    """Serve repeat analytics requests from cache and answer If-None-Match with 304"""
+    if request.method != "GET" or request.url.path not in CACHED_PATHS:
+        return await call_next(request)
+    
+    key = response_cache.key(request.url.path, request.url.query, db_manager.data_version)
+    entry = response_cache.get(key)
+    cache_status = "HIT"
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        entry = response_cache.put(key, body, headers)
+        cache_status = "MISS"
+    
+    validators = {"ETag": entry["etag"], "X-Cache": cache_status}
+    if etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers=validators)
+    return Response(content=entry["body"], headers=dict(entry["headers"], **validators))
+
+
+# Outermost, so cache hits, 304s and rejected requests are measured too
+app.add_middleware(MetricsMiddleware)
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize database and load the series store on startup"""
     db_manager.init_database()
+    series_store.load()
+    print(f"Data version {db_manager.data_version}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the worker pools"""
+    download_jobs.shutdown()
+    shutdown_pools()
 
 
 @app.get("/")
@@ -64,7 +115,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    latest_date = db_manager.get_latest_date()
+    # Served from memory so it stays responsive while the worker pools are busy
+    latest_date = series_store.get_latest_date()
     return {
         "status": "healthy",
         "database": "connected",
@@ -72,121 +124,124 @@ async def health_check():
     }
 
 
-@app.post("/data/download")
-async def download_data():
-    """Download and update H8 data"""
-    result = data_loader.load_and_update()
-    return result
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Response cache hit/miss counters and size"""
+    return response_cache.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Request, query and analytics stage metrics in Prometheus text format"""
+    DATA_VERSION.set(db_manager.data_version)
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.post("/data/download", status_code=202)
+async def download_data(
+    full: bool = Query(False, description="Reload full history instead of only new or revised observations")
+):
+    """Start a background download and load of H8 data, or join a running one of the same mode"""
+    # Full and incremental loads are separate kinds, so a full reload is queued behind
+    # a running incremental load instead of being answered with its job
+    return download_jobs.submit(
+        'download_full' if full else 'download',
+        lambda progress: data_loader.load_and_update(incremental=not full, progress=progress)
+    )
+
+
+@app.get("/data/download/{job_id}")
+async def get_download_job(job_id: str):
+    """Phase, progress and result of a download job"""
+    job = download_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown download job: {job_id}")
+    return job
 
 
 @app.get("/data/series")
-async def get_series_data(
+@blocking()
+def get_series_data(
     series_name: Optional[str] = Query(None, description="Series name to filter"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    limit: int = Query(1000, description="Maximum number of records")
+    limit: int = Query(1000, ge=0, description="Maximum number of records (0 for no limit)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("records", pattern=FORMAT_PATTERN,
+                        description="Output format: records, columns, ndjson, arrow (IPC stream) or parquet")
 ):
-    """Get H8 series data"""
+    """Get H8 series data, paged in (series_name, series_code, date) order"""
+    check_format(format)
+    check_dates(start_date, end_date)
+    after = decode_cursor(cursor)
     try:
-        df = db_manager.get_data(series_name, start_date, end_date)
-        
-        if df.empty:
-            return {"data": [], "count": 0}
+        if format == 'ndjson':
+            # Stream straight from a database cursor so memory stays bounded per request
+            return ndjson_stream(db_manager.iter_data(limit or None, after, series_name,
+                                                      start_date, end_date))
         
-        # Limit results
-        df = df.head(limit)
-        
-        return {
-            "data": df.to_dict(orient='records'),
-            "count": len(df)
-        }
+        df = series_store.get_page(limit or None, after, series_name, start_date, end_date)
+        next_cursor = encode_cursor(df.iloc[-1]) if limit and len(df) == limit else None
+        return frame_response(df, format, next_cursor=next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/data/summary")
-async def get_data_summary():
+@blocking()
+def get_data_summary():
     """Get summary statistics of available data"""
     try:
-        df = db_manager.get_data()
+        summary = db_manager.get_summary()
         
-        if df.empty:
+        if not summary['total_records']:
             return {"status": "no_data"}
         
-        return {
-            "total_records": len(df),
-            "date_range": {
-                "min": df['date'].min(),
-                "max": df['date'].max()
-            },
-            "series_count": df['series_name'].nunique(),
-            "asset_classes": df['asset_class'].unique().tolist(),
-            "bank_types": df['bank_type'].unique().tolist()
-        }
+        return summary
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/analytics/growth-rates")
-async def get_growth_rates(
+@blocking()
+def get_growth_rates(
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     asset_class: Optional[str] = Query("commercial_industrial", description="Asset class to analyze"),
-    max_series: int = Query(3, description="Maximum number of series to return")
+    max_series: int = Query(3, description="Maximum number of series to return"),
+    format: str = Query("records", pattern=FORMAT_PATTERN,
+                        description="Output format: records, columns, ndjson, arrow (IPC stream) or parquet")
 ):
     """Calculate growth rates (WoW, MoM, YoY) for top series"""
+    check_format(format)
+    check_dates(start_date, end_date)
     try:
-        # Get data for specific asset class only
-        df = db_manager.get_data(start_date=start_date, end_date=end_date)
-        
-        if df.empty:
-            return {"data": [], "count": 0}
+        # Pick the top series by data points for the asset class, then read only those
+        series = series_store.get_series(asset_class=asset_class or None,
+                                         start_date=start_date, end_date=end_date)
         
-        # Filter by asset class
-        if asset_class:
-            df = df[df['asset_class'] == asset_class]
+        if series.empty:
+            return frame_response(pd.DataFrame(), format)
         
-        if df.empty:
-            return {"data": [], "count": 0}
+        top_series = series['series_name'].head(max_series).tolist()
         
-        # Get top series by data points
-        series_counts = df['series_name'].value_counts().head(max_series)
-        top_series = series_counts.index.tolist()
+        # Growth rates are materialized at ingest time; only records with valid YoY data
+        df_with_growth = db_manager.get_growth_rates(GROWTH_LAGS, series_name=top_series,
+                                                     start_date=start_date, end_date=end_date,
+                                                     require_lag=52)
         
-        # Filter to only top series
-        df = df[df['series_name'].isin(top_series)]
+        if df_with_growth.empty:
+            # Not materialized yet (database loaded before growth tables existed)
+            df = series_store.get_data(series_name=top_series, start_date=start_date,
+                                       end_date=end_date, order_by=['date'])
+            df_with_growth = analytics.calculate_growth_rates(df)
+            df_with_growth = df_with_growth[df_with_growth['yoy_change'].notna()]
         
         # Limit to 1000 most recent records per series
-        df = df.sort_values('date').groupby('series_name').tail(1000)
+        df_with_growth = df_with_growth.groupby('series_name').tail(1000)
         
-        df_with_growth = analytics.calculate_growth_rates(df)
-        
-        # Only return records with valid YoY data
-        df_with_growth = df_with_growth[df_with_growth['yoy_change'].notna()]
-        
-        # Convert to dict and clean up NaN/inf values
-        records = df_with_growth.to_dict(orient='records')
-        
-        # Clean each record
-        import math
-        cleaned_records = []
-        for record in records:
-            cleaned = {}
-            for key, value in record.items():
-                if isinstance(value, float):
-                    if math.isnan(value) or math.isinf(value):
-                        cleaned[key] = None
-                    else:
-                        cleaned[key] = value
-                else:
-                    cleaned[key] = value
-            cleaned_records.append(cleaned)
-        
-        return {
-            "data": cleaned_records,
-            "count": len(cleaned_records),
-            "series": top_series
-        }
+        # orjson writes NaN/inf as null, so no per-value cleanup is needed
+        return frame_response(df_with_growth, format, series=top_series)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -194,35 +249,49 @@ async def get_growth_rates(
 
 
 @app.get("/analytics/anomalies")
-async def detect_anomalies(
+@blocking()
+def detect_anomalies(
     threshold: float = Query(2.5, description="Z-score threshold for anomaly detection"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    method: str = Query("zscore", pattern="^(zscore|rolling|robust|yoy|ewma)$",
+                        description="Z-score method: zscore, rolling, robust (median/MAD), yoy or ewma"),
+    window: int = Query(ANOMALY_WINDOW, ge=4, le=520,
+                        description="Window in weeks (rolling, yoy and ewma methods)"),
+    format: str = Query("records", pattern=FORMAT_PATTERN,
+                        description="Output format: records, columns, ndjson, arrow (IPC stream) or parquet")
 ):
     """Detect anomalies in H8 data"""
+    check_format(format)
+    check_dates(start_date, end_date)
     try:
-        df = db_manager.get_data(start_date=start_date, end_date=end_date)
+        # Incremental methods are served from scores persisted at ingest time
+        anomalies = None
+        if method in PERSISTED_ANOMALY_METHODS and window == ANOMALY_WINDOW:
+            anomalies = db_manager.get_anomalies(method, window, threshold, start_date, end_date)
         
-        if df.empty:
-            return {"anomalies": [], "count": 0}
+        if anomalies is None:
+            df = series_store.get_data(start_date=start_date, end_date=end_date)
+            
+            if df.empty:
+                return frame_response(df, format, key='anomalies')
+            
+            df_with_anomalies = analytics.detect_anomalies(df, threshold, method=method, window=window)
+            anomalies = df_with_anomalies[df_with_anomalies['is_anomaly'] == True]
         
-        df_with_anomalies = analytics.detect_anomalies(df, threshold)
-        anomalies = df_with_anomalies[df_with_anomalies['is_anomaly'] == True]
-        
-        return {
-            "anomalies": anomalies.to_dict(orient='records'),
-            "count": len(anomalies)
-        }
+        return frame_response(anomalies, format, key='anomalies')
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/analytics/flli")
-async def get_flli(
+@blocking()
+def get_flli(
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
 ):
     """Get Forward-Looking Lending Index (FLLI)"""
+    check_dates(start_date, end_date)
     try:
         result = analytics.calculate_flli(start_date, end_date)
         return result
@@ -230,20 +299,44 @@ async def get_flli(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/analytics/flli/history")
+@blocking()
+def get_flli_history(
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    format: str = Query("records", pattern=FORMAT_PATTERN,
+                        description="Output format: records, columns, ndjson, arrow (IPC stream) or parquet")
+):
+    """Weekly Forward-Looking Lending Index values and components"""
+    check_format(format)
+    check_dates(start_date, end_date)
+    try:
+        history = analytics.flli_history(start_date, end_date)
+        return frame_response(history, format)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/analytics/clusters")
-async def get_bank_clusters(
+@blocking()
+def get_bank_clusters(
     n_clusters: int = Query(3, description="Number of clusters", ge=2, le=10)
 ):
     """Cluster banks by lending behavior"""
     try:
-        result = analytics.cluster_banks(n_clusters)
-        return result
+        # Features are cached per data version; the fit runs in a worker process
+        features = analytics.cluster_engine.features()
+        with timed_stage('fit_clusters'):
+            return run_cpu(fit_clusters, features, n_clusters)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/ai/query")
-async def ai_query(question: str):
+@blocking()
+def ai_query(question: str):
     """Ask AI assistant about H8 data"""
     try:
         result = ai_assistant.query(question)
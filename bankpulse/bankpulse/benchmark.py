@@ -0,0 +1,370 @@
+"""End-to-end benchmark suite over synthetic H8 data at several scales"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+# Scales as SERIESxWEEKS; 2087 weeks is 40 years of weekly data
+DEFAULT_SCALES = ['100x520', '500x1040', '2000x2087']
+DEFAULT_REPEAT = 3
+DEFAULT_REQUESTS = 20
+# A stage regresses when its median grows by more than this fraction...
+REGRESSION_THRESHOLD = 0.2
+# ...and by more than this many seconds, so sub-millisecond noise is ignored
+REGRESSION_MIN_SECONDS = 0.005
+
+# Endpoints timed through an in-process client; cached ones are timed cold and warm
+API_ENDPOINTS = [
+    '/health',
+    '/data/summary',
+    '/data/series?limit=1000',
+    '/data/series?limit=1000&format=columns',
+    '/data/series?limit=0&format=ndjson',
+    '/analytics/growth-rates',
+    '/analytics/anomalies?method=zscore',
+    '/analytics/anomalies?method=rolling',
+    '/analytics/flli',
+    '/analytics/flli/history',
+    '/analytics/clusters',
+]
+
+
+def parse_scale(scale: str) -> Dict[str, int]:
+    """'2000x2087' -> {'series': 2000, 'weeks': 2087}"""
+    series, weeks = scale.lower().split('x')
+    return {'series': int(series), 'weeks': int(weeks)}
+
+
+def summarize(seconds: List[float]) -> Dict:
+    """Latency statistics in seconds"""
+    values = np.asarray(seconds, dtype=np.float64)
+    return {
+        'runs': len(values),
+        'mean': float(values.mean()),
+        'min': float(values.min()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+    }
+
+
+def measure(func: Callable, repeat: int = DEFAULT_REPEAT, setup: Optional[Callable] = None,
+            rows: Optional[Callable] = None, memory: bool = True) -> Dict:
+    """Time func over repeat runs, then trace one more run for peak Python memory"""
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    stats = summarize(seconds)
+    
+    if memory:
+        # Separate run, since tracing slows allocation-heavy code down
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            func()
+            stats['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        finally:
+            tracemalloc.stop()
+    
+    if rows:
+        count = int(rows(result))
+        stats['rows'] = count
+        stats['rows_per_second'] = round(count / stats['p50'], 1) if stats['p50'] else None
+    return stats
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_directory(directory: Path) -> ThreadingHTTPServer:
+    """Local HTTP stand-in for the Fed download endpoint"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _remove_database(path: Path):
+    for suffix in ['', '-wal', '-shm']:
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+
+def run_scale(series: int, weeks: int, workdir: Path, repeat: int = DEFAULT_REPEAT,
+              requests: int = DEFAULT_REQUESTS, workers: int = 1, memory: bool = True) -> Dict:
+    """Benchmark every stage at one scale (DATABASE_PATH and DATA_DIR must point into workdir)"""
+    from .analytics import CreditAnalytics, ANOMALY_METHODS, FLLI_ASSET_CLASSES
+    from .config import DATABASE_PATH
+    from .data_loader import H8DataLoader
+    from .database import DatabaseManager
+    from .store import SeriesStore
+    from .synthetic import generate_archive
+    
+    stages = {}
+    database_path = Path(DATABASE_PATH)
+    archive = workdir / 'synthetic_h8.zip'
+    
+    def stage(name: str, func: Callable, heavy: bool = False, **kwargs):
+        print(f"  {name}...", flush=True)
+        stages[name] = measure(func, repeat=1 if heavy else repeat, memory=memory, **kwargs)
+    
+    # Setup: the archive itself
+    start = time.perf_counter()
+    generated = generate_archive(archive, series, weeks)
+    stages['synthesize'] = dict(summarize([time.perf_counter() - start]), bytes=generated['bytes'])
+    
+    # Download the archive from a local server, then parse it from disk
+    server = serve_directory(workdir)
+    try:
+        loader = H8DataLoader(None, data_url=f"http://127.0.0.1:{server.server_address[1]}/{archive.name}")
+        
+        def forget_archive():
+            loader.archive_path.unlink(missing_ok=True)
+            (loader.data_dir / 'h8_archive.json').unlink(missing_ok=True)
+        
+        stage('download', loader.download_data, heavy=True, setup=forget_archive)
+        size = loader.archive_path.stat().st_size
+        stages['download'].update(bytes=size, mb_per_second=round(size / 1e6 / stages['download']['p50'], 2))
+    finally:
+        server.shutdown()
+    
+    members = loader._archive_members(archive)['data']
+    count_rows = lambda parsed: sum(len(s['values']) for s in parsed)
+    stage('parse', lambda: list(loader._parse_sequential(archive, members)), heavy=True, rows=count_rows)
+    if workers > 1:
+        stage(f'parse_{workers}_workers', lambda: list(loader._parse_parallel(archive, members, workers)),
+              heavy=True, rows=count_rows)
+    # Held in scratch rather than a local so it can be freed while closures still run
+    scratch = {'frame': loader._series_to_frame(list(loader._parse_sequential(archive, members)))}
+    frame_rows = len(scratch['frame'])
+    
+    # Bulk insert alone, then the full ingest with derived tables, into fresh databases
+    
+    def fresh_database(path: Path):
+        _remove_database(path)
+        scratch['db'] = DatabaseManager(str(path))
+        scratch['db'].init_database()
+    
+    stage('db_insert', lambda: scratch['db'].insert_data(scratch['frame']), heavy=True,
+          setup=partial(fresh_database, workdir / 'insert.db'), rows=lambda result: frame_rows)
+    
+    def fresh_ingest():
+        fresh_database(database_path)
+        CreditAnalytics(scratch['db'])
+        scratch['loader'] = H8DataLoader(scratch['db'])
+    
+    stage('ingest', lambda: scratch['loader'].load_and_update(incremental=False, source=str(archive)),
+          heavy=True, setup=fresh_ingest, rows=lambda result: result['records_added'])
+    _remove_database(workdir / 'insert.db')
+    del scratch['frame']
+    
+    # Read paths and analytics against the ingested database
+    db = DatabaseManager(str(database_path))
+    store = SeriesStore(db)
+    store.load()
+    analytics = CreditAnalytics(db, store=store)
+    latest = db.get_latest_date()
+    year_ago = str(np.datetime64(latest, 'D') - np.timedelta64(52 * 7, 'D'))
+    quarter_ago = str(np.datetime64(latest, 'D') - np.timedelta64(11 * 7, 'D'))
+    first_series = db.get_series()['series_name'].iloc[0]
+    
+    reads = {
+        'get_data_all': lambda source: source.get_data(),
+        'get_data_asset_class': lambda source: source.get_data(asset_class='commercial_industrial'),
+        'get_data_last_year': lambda source: source.get_data(start_date=year_ago),
+        'get_data_one_series': lambda source: source.get_data(series_name=first_series),
+        'get_data_latest_1000': lambda source: source.get_data(order_by=['date'], descending=True,
+                                                               limit=1000),
+        'get_page_1000': lambda source: source.get_page(1000),
+    }
+    for name, read in reads.items():
+        stage(f'db_{name}', partial(read, db), rows=len)
+        stage(f'store_{name}', partial(read, store), rows=len)
+    
+    # Bound with partial so dropping the name below actually frees the frame
+    data = store.get_data()
+    data_rows = len(data)
+    stage('calculate_growth_rates', partial(analytics.calculate_growth_rates, data),
+          rows=lambda _: data_rows)
+    for method in ANOMALY_METHODS:
+        stage(f'detect_anomalies_{method}', partial(analytics.detect_anomalies, data, method=method),
+              rows=lambda _: data_rows)
+    del data
+    
+    def forget_features():
+        analytics.cluster_engine._cached = None
+    
+    stage('cluster_banks', partial(analytics.cluster_banks, 3), setup=forget_features)
+    stage('calculate_flli_latest', analytics.calculate_flli)
+    stage('calculate_flli_window', partial(analytics.calculate_flli, quarter_ago, latest))
+    flli_data = store.get_data(asset_class=FLLI_ASSET_CLASSES,
+                               columns=['series_code', 'date', 'value', 'asset_class'])
+    stage('compute_flli_history', partial(analytics.compute_flli_history, flli_data),
+          rows=lambda _: len(flli_data))
+    
+    stages.update(run_api(requests))
+    
+    return {
+        'series': series,
+        'weeks': weeks,
+        'observations': int(db.get_summary()['total_records']),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'stages': stages,
+    }
+
+
+def run_api(requests: int) -> Dict:
+    """Latency percentiles and response sizes per endpoint through an in-process client"""
+    from fastapi.testclient import TestClient
+    from . import api
+    from .cache import CACHED_PATHS
+    
+    stages = {}
+    with TestClient(api.app) as client:
+        for endpoint in API_ENDPOINTS:
+            print(f"  GET {endpoint}...", flush=True)
+            path = endpoint.split('?')[0]
+            modes = ['cold', 'warm'] if path in CACHED_PATHS else ['cold']
+            for mode in modes:
+                seconds = []
+                size = 0
+                for _ in range(requests):
+                    if mode == 'cold':
+                        api.response_cache.clear()
+                    start = time.perf_counter()
+                    response = client.get(endpoint)
+                    seconds.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                    size = len(response.content)
+                name = f'api GET {endpoint}' + (f' ({mode})' if len(modes) > 1 else '')
+                stages[name] = dict(summarize(seconds), response_bytes=size)
+    return stages
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """Print median changes per stage and return the stages that regressed"""
+    regressions = []
+    for scale, result in current['scales'].items():
+        before = baseline.get('scales', {}).get(scale)
+        if not before:
+            print(f"\n{scale}: not in baseline")
+            continue
+        print(f"\n{scale}: {'stage':<52} {'baseline':>10} {'current':>10} {'change':>8}")
+        for name, stats in result['stages'].items():
+            old = before['stages'].get(name)
+            if not old:
+                continue
+            change = stats['p50'] / old['p50'] - 1 if old['p50'] else 0.0
+            regressed = (change > threshold
+                         and stats['p50'] - old['p50'] > REGRESSION_MIN_SECONDS)
+            flag = '  REGRESSION' if regressed else ''
+            print(f"{'':{len(scale) + 2}}{name:<52} {old['p50']:>9.4f}s {stats['p50']:>9.4f}s "
+                  f"{change:>+7.1%}{flag}")
+            if regressed:
+                regressions.append({'scale': scale, 'stage': name, 'baseline': old['p50'],
+                                    'current': stats['p50'], 'change': round(change, 4)})
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                               check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(scales: List[str] = None, repeat: int = DEFAULT_REPEAT,
+              requests: int = DEFAULT_REQUESTS, workers: int = 1, memory: bool = True,
+              output: Optional[str] = None, baseline: Optional[str] = None,
+              threshold: float = REGRESSION_THRESHOLD, workdir: Optional[str] = None) -> Dict:
+    """Run each scale in its own process and collect the results (compared to a baseline if given)"""
+    scales = scales or DEFAULT_SCALES
+    root = Path(workdir) if workdir else Path(tempfile.mkdtemp(prefix='bankpulse-bench-'))
+    results = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': {'repeat': repeat, 'requests': requests, 'workers': workers},
+        'scales': {},
+    }
+    
+    try:
+        for scale in scales:
+            size = parse_scale(scale)
+            scale_dir = root / scale
+            shutil.rmtree(scale_dir, ignore_errors=True)
+            scale_dir.mkdir(parents=True)
+            result_path = scale_dir / 'result.json'
+            print(f"\n=== {size['series']} series x {size['weeks']} weeks ===", flush=True)
+            
+            # A fresh process per scale isolates the database path, caches and peak RSS
+            env = dict(os.environ, DATABASE_PATH=str(scale_dir / 'bankpulse.db'),
+                       DATA_DIR=str(scale_dir / 'data'))
+            command = [sys.executable, '-m', 'bankpulse.benchmark', '--scale', scale,
+                       '--workdir', str(scale_dir), '--result', str(result_path),
+                       '--repeat', str(repeat), '--requests', str(requests),
+                       '--workers', str(workers)]
+            if not memory:
+                command.append('--no-memory')
+            subprocess.run(command, env=env, check=True, cwd=Path(__file__).parent.parent)
+            results['scales'][scale] = json.loads(result_path.read_text())
+    finally:
+        if not workdir:
+            shutil.rmtree(root, ignore_errors=True)
+    
+    # Compared first so the saved results include the regressions
+    if baseline:
+        regressions = compare(json.loads(Path(baseline).read_text()), results, threshold)
+        results['regressions'] = regressions
+        print(f"\n{len(regressions)} regression(s) over {threshold:.0%}")
+    
+    if output:
+        Path(output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {output}")
+    return results
+
+
+def _run_child():
+    """Entry point of the per-scale benchmark process"""
+    parser = argparse.ArgumentParser(description='Benchmark one scale (run by run_suite)')
+    parser.add_argument('--scale', required=True)
+    parser.add_argument('--workdir', required=True)
+    parser.add_argument('--result', required=True)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true')
+    args = parser.parse_args()
+    
+    size = parse_scale(args.scale)
+    result = run_scale(size['series'], size['weeks'], Path(args.workdir), repeat=args.repeat,
+                       requests=args.requests, workers=args.workers, memory=not args.no_memory)
+    Path(args.result).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    _run_child()
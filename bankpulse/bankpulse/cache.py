@@ -0,0 +1,121 @@
+"""Response cache for analytics endpoints, invalidated by the database data version"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from .config import RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MB
+
+# Endpoints whose responses depend only on their query parameters and the stored data
+CACHED_PATHS = [
+    '/data/summary',
+    '/analytics/growth-rates',
+    '/analytics/anomalies',
+    '/analytics/flli',
+    '/analytics/flli/history',
+    '/analytics/clusters',
+]
+
+# Response headers replayed from cache (others are recomputed by the server)
+CACHED_HEADERS = ['content-type', 'x-record-count']
+
+
+def normalize_query(query_string: str) -> str:
+    """Canonical query string: empty values dropped, parameters sorted"""
+    params = [(key, value) for key, value in parse_qsl(query_string, keep_blank_values=True) if value != '']
+    return urlencode(sorted(params))
+
+
+def make_etag(version: int, body: bytes) -> str:
+    """Strong ETag from the data version and a digest of the body"""
+    return f'"{version}-{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers the given ETag"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered responses bounded by entry count and total bytes"""
+    
+    def __init__(self, max_entries: int = RESPONSE_CACHE_ENTRIES,
+                 max_bytes: int = int(RESPONSE_CACHE_MB * 1024 * 1024)):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'stores': 0, 'evictions': 0}
+    
+    def key(self, path: str, query_string: str, version: int) -> Tuple:
+        return (path, normalize_query(query_string), version)
+    
+    def get(self, key: Tuple) -> Optional[Dict]:
+        """Cached entry for key, counting the hit or miss"""
+        with self._lock:
+            self._purge_stale(key[-1])
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry
+    
+    def put(self, key: Tuple, body: bytes, headers: Dict[str, str]) -> Dict:
+        """Store a rendered response and return its entry (with ETag)"""
+        entry = {'body': body, 'headers': headers, 'etag': make_etag(key[-1], body)}
+        if len(body) > self.max_bytes:
+            return entry
+        
+        with self._lock:
+            self._purge_stale(key[-1])
+            if key[-1] != self._version:
+                # Computed against data that has since been replaced
+                return entry
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous['body'])
+            self._entries[key] = entry
+            self._bytes += len(body)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted['body'])
+                self._stats['evictions'] += 1
+        return entry
+    
+    def record_not_modified(self):
+        with self._lock:
+            self._stats['not_modified'] += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                data_version=self._version,
+            )
+    
+    def _purge_stale(self, version: int):
+        """Drop every entry once a newer data version is seen"""
+        if self._version is None or version > self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
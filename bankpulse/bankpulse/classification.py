@@ -0,0 +1,163 @@
+"""Rule-based classification of H8 series into bank types and asset classes"""
+
+import json
+import re
+from typing import Dict, List, Optional, Union, BinaryIO
+from lxml import etree
+
+# Classified fields, each with ordered rules (first match wins) and a fallback value.
+# A rule matches when every condition it lists holds:
+#   contains     - any of the substrings occurs in the lower-cased series description
+#   codes        - {attribute: [codes]} on the Series element's dimension/attribute codes
+#   labels       - any of the substrings occurs in the H8_struct.xml codelist descriptions
+#                  of the series' codes
+#   series_code  - regular expression searched in the series code
+DEFAULT_RULES = {
+    'bank_type': {
+        'default': 'all',
+        'rules': [
+            {'value': 'small', 'contains': ['small']},
+            {'value': 'large', 'contains': ['large', 'domestically chartered']},
+            {'value': 'foreign', 'contains': ['foreign']},
+        ],
+    },
+    'asset_class': {
+        'default': 'other',
+        'rules': [
+            {'value': 'commercial_industrial', 'contains': ['commercial and industrial', 'c&i']},
+            {'value': 'real_estate', 'contains': ['real estate']},
+            {'value': 'consumer', 'contains': ['consumer']},
+            {'value': 'deposits', 'contains': ['deposit']},
+            {'value': 'reserves', 'contains': ['reserve']},
+            {'value': 'loans', 'contains': ['loan']},
+        ],
+    },
+}
+
+# Series attributes that identify the series rather than classify it
+IGNORED_ATTRIBUTES = ['SERIES_NAME']
+
+CODELIST_TAGS = ['CodeList', 'Codelist']
+COMPONENT_TAGS = ['Dimension', 'Attribute', 'TimeDimension', 'PrimaryMeasure']
+
+
+def load_rules(path: Optional[str]) -> Dict:
+    """Rule table from a JSON file, or the built-in description rules"""
+    if not path:
+        return DEFAULT_RULES
+    with open(path) as f:
+        rules = json.load(f)
+    unknown = set(rules) - set(DEFAULT_RULES)
+    if unknown:
+        raise ValueError(f"Unknown classification fields: {', '.join(sorted(unknown))}")
+    # Fields the file leaves out keep the built-in rules
+    return {**DEFAULT_RULES, **rules}
+
+
+def series_attributes(attrib) -> Dict[str, str]:
+    """Classification-relevant codes from a Series element's attributes"""
+    return {key: value for key, value in attrib.items() if key not in IGNORED_ATTRIBUTES}
+
+
+def parse_structure(source: Union[str, BinaryIO]) -> Dict[str, Dict[str, str]]:
+    """Map each Series attribute to {code: description} from an SDMX H8_struct.xml"""
+    codelists = {}
+    concepts = {}
+    for _, element in etree.iterparse(source, events=('end',)):
+        tag = etree.QName(element).localname
+        if tag in CODELIST_TAGS and element.get('id'):
+            codes = {}
+            for code in element.iter('{*}Code'):
+                value = code.get('value') or code.get('id')
+                label = code.find('{*}Description')
+                if label is None:
+                    label = code.find('{*}Name')
+                if value is not None and label is not None and label.text:
+                    codes[value] = label.text.strip()
+            codelists[element.get('id')] = codes
+            element.clear()
+        elif tag in COMPONENT_TAGS and element.get('codelist'):
+            concept = element.get('conceptRef') or element.get('id')
+            if concept:
+                concepts[concept] = element.get('codelist')
+    
+    return {concept: codelists.get(codelist, {}) for concept, codelist in concepts.items()}
+
+
+class SeriesClassifier:
+    """Classifies series once from their description and codes, caching the result"""
+    
+    def __init__(self, rules: Optional[Dict] = None,
+                 structure: Optional[Dict[str, Dict[str, str]]] = None):
+        self.rules = rules or DEFAULT_RULES
+        self.structure = structure or {}
+        self._compiled = self._compile(self.rules)
+        self._cache = {}
+    
+    def load_structure(self, source: Union[str, BinaryIO]):
+        """Use codelist descriptions from an H8_struct.xml for label rules"""
+        self.structure = parse_structure(source)
+        self._cache.clear()
+    
+    def classify(self, series_code: str, description: str,
+                 attributes: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Classify a series into {'bank_type': ..., 'asset_class': ...}"""
+        attributes = attributes or {}
+        key = (series_code, description, tuple(sorted(attributes.items())))
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._classify(series_code, description, attributes)
+            self._cache[key] = cached
+        return dict(cached)
+    
+    def classify_all(self, series: List[Dict]) -> List[Dict[str, str]]:
+        """Classify stored series records (series_code, series_name, attributes)"""
+        return [self.classify(s['series_code'], s['series_name'], s.get('attributes'))
+                for s in series]
+    
+    def _classify(self, series_code: str, description: str,
+                  attributes: Dict[str, str]) -> Dict[str, str]:
+        text = description.lower()
+        labels = ' '.join(self.structure.get(name, {}).get(code, '')
+                          for name, code in attributes.items()).lower()
+        
+        result = {}
+        for field, (rules, default) in self._compiled.items():
+            result[field] = next(
+                (rule['value'] for rule in rules
+                 if self._matches(rule, series_code, text, labels, attributes)),
+                default
+            )
+        return result
+    
+    def _matches(self, rule: Dict, series_code: str, text: str, labels: str,
+                 attributes: Dict[str, str]) -> bool:
+        if 'contains' in rule and not any(term in text for term in rule['contains']):
+            return False
+        if 'labels' in rule and not any(term in labels for term in rule['labels']):
+            return False
+        if 'codes' in rule and not all(attributes.get(name) in codes
+                                       for name, codes in rule['codes'].items()):
+            return False
+        if 'series_code' in rule and not rule['series_code'].search(series_code):
+            return False
+        return True
+    
+    def _compile(self, rules: Dict) -> Dict:
+        """Normalize a rule table: lower-cased substrings, compiled patterns, list codes"""
+        compiled = {}
+        for field, spec in rules.items():
+            field_rules = []
+            for rule in spec.get('rules', []):
+                rule = dict(rule)
+                for key in ['contains', 'labels']:
+                    if key in rule:
+                        rule[key] = [term.lower() for term in rule[key]]
+                if 'codes' in rule:
+                    rule['codes'] = {name: [codes] if isinstance(codes, str) else list(codes)
+                                     for name, codes in rule['codes'].items()}
+                if 'series_code' in rule:
+                    rule['series_code'] = re.compile(rule['series_code'])
+                field_rules.append(rule)
+            compiled[field] = (field_rules, spec.get('default', DEFAULT_RULES[field]['default']))
+        return compiled
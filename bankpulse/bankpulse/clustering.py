@@ -0,0 +1,219 @@
+"""Clustering of series on compact growth and shape features"""
+
+import threading
+import warnings
+from typing import Dict
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA
+from sklearn.metrics import silhouette_samples
+from sklearn.preprocessing import StandardScaler
+
+from .config import (CLUSTER_WINDOW_WEEKS, CLUSTER_SHAPE_POINTS, CLUSTER_PCA_COMPONENTS,
+                     CLUSTER_MINIBATCH_THRESHOLD)
+from .database import DatabaseManager
+from .metrics import timed_stage
+
+# Growth features need a year of history before the window for YoY
+GROWTH_LOOKBACK_WEEKS = 52
+# Series with fewer observations inside the window are left out
+MIN_CLUSTER_OBSERVATIONS = 13
+GROWTH_FEATURES = ['wow_mean', 'wow_volatility', 'mom_change', 'yoy_change']
+# Silhouette is O(n^2), so it is estimated on a sample for large inputs
+SILHOUETTE_SAMPLE_SIZE = 2000
+MINIBATCH_SIZE = 1024
+RANDOM_STATE = 42
+
+
+def _pct_change(later: np.ndarray, earlier: np.ndarray) -> np.ndarray:
+    """Percent change, NaN where the base is missing or not positive"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (later - earlier) / earlier * 100
+    return np.where(earlier > 0, change, np.nan)
+
+
+def _nan_stats(values: np.ndarray):
+    """Row-wise nanmean and nanstd, quietly NaN for rows with no data"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(values, axis=1), np.nanstd(values, axis=1)
+
+
+def _aligned_matrix(data: pd.DataFrame, weeks: int):
+    """Series x week matrix over the trailing weeks, NaN where a series has no observation"""
+    dates = pd.to_datetime(data['date']).to_numpy(dtype='datetime64[D]')
+    latest = dates.max()
+    offsets = (latest - dates).astype(np.int64) // 7
+    keep = offsets < weeks
+    
+    codes, rows = np.unique(data['series_code'].to_numpy()[keep], return_inverse=True)
+    matrix = np.full((len(codes), weeks), np.nan)
+    matrix[rows, weeks - 1 - offsets[keep]] = data['value'].to_numpy(dtype=np.float64)[keep]
+    matrix[~np.isfinite(matrix)] = np.nan
+    return codes, matrix, str(latest)
+
+
+def _growth_features(matrix: np.ndarray) -> np.ndarray:
+    """WoW mean/volatility over the window plus latest MoM and YoY changes"""
+    window = matrix[:, GROWTH_LOOKBACK_WEEKS:]
+    wow_mean, wow_volatility = _nan_stats(_pct_change(window[:, 1:], window[:, :-1]))
+    mom = _pct_change(matrix[:, -1], matrix[:, -5])
+    yoy = _pct_change(matrix[:, -1], matrix[:, -1 - GROWTH_LOOKBACK_WEEKS])
+    return np.column_stack([wow_mean, wow_volatility, mom, yoy])
+
+
+def _shape_features(window: np.ndarray, points: int) -> np.ndarray:
+    """Per-series standardized window averaged into a fixed number of buckets"""
+    mean, std = _nan_stats(window)
+    std = np.where(std > 0, std, 1.0)
+    scaled = (window - mean[:, None]) / std[:, None]
+    
+    # Bucket averages over the observed weeks only; empty buckets sit at the series mean (0)
+    starts = np.linspace(0, window.shape[1], points + 1).astype(int)[:-1]
+    observed = ~np.isnan(scaled)
+    sums = np.add.reduceat(np.where(observed, scaled, 0.0), starts, axis=1)
+    counts = np.add.reduceat(observed.astype(np.int64), starts, axis=1)
+    return np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+
+def build_features(data: pd.DataFrame, window_weeks: int = CLUSTER_WINDOW_WEEKS,
+                   shape_points: int = CLUSTER_SHAPE_POINTS,
+                   pca_components: int = CLUSTER_PCA_COMPONENTS) -> Dict:
+    """Compact per-series feature matrix over an aligned trailing window
+    
+    Features are growth statistics plus the PCA-reduced shape of each series, so the
+    matrix size depends on the number of series, not on the length of history.
+    """
+    empty = {'series_codes': [], 'series_names': [], 'features': np.empty((0, 0)),
+             'feature_names': [], 'excluded_series': 0, 'window_end': None}
+    if data.empty:
+        return empty
+    
+    codes, matrix, window_end = _aligned_matrix(data, window_weeks + GROWTH_LOOKBACK_WEEKS)
+    window = matrix[:, GROWTH_LOOKBACK_WEEKS:]
+    enough = (~np.isnan(window)).sum(axis=1) >= MIN_CLUSTER_OBSERVATIONS
+    excluded = int((~enough).sum())
+    codes, matrix, window = codes[enough], matrix[enough], window[enough]
+    if not len(codes):
+        return dict(empty, excluded_series=excluded, window_end=window_end)
+    
+    growth = _growth_features(matrix)
+    # Missing growth readings take the cross-series median so they do not pull clusters
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        medians = np.nan_to_num(np.nanmedian(growth, axis=0))
+    growth = np.where(np.isfinite(growth), growth, medians)
+    
+    shape = _shape_features(window, min(shape_points, window.shape[1]))
+    components = min(pca_components, len(codes), shape.shape[1])
+    if components >= 1 and len(codes) > 1:
+        shape = PCA(n_components=components, random_state=RANDOM_STATE).fit_transform(shape)
+    else:
+        shape = shape[:, :components]
+    
+    names = data.drop_duplicates('series_code').set_index('series_code')['series_name']
+    return {
+        'series_codes': codes.tolist(),
+        'series_names': names.reindex(codes).tolist(),
+        'features': np.column_stack([growth, shape]),
+        'feature_names': GROWTH_FEATURES + [f'shape_pc{i + 1}' for i in range(shape.shape[1])],
+        'excluded_series': excluded,
+        'window_end': window_end,
+    }
+
+
+def fit_clusters(features: Dict, n_clusters: int = 3,
+                 minibatch_threshold: int = CLUSTER_MINIBATCH_THRESHOLD) -> Dict:
+    """Cluster a feature matrix, returning centroids and silhouette scores (runs in worker processes)"""
+    matrix = features['features']
+    if not len(matrix):
+        return {'status': 'no_data', 'clusters': []}
+    if len(matrix) < n_clusters:
+        return {'status': 'insufficient_data', 'clusters': []}
+    
+    scaler = StandardScaler()
+    scaled = scaler.fit_transform(matrix)
+    
+    if len(matrix) > minibatch_threshold:
+        algorithm = 'minibatch_kmeans'
+        model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=MINIBATCH_SIZE,
+                                n_init=3, random_state=RANDOM_STATE)
+    else:
+        algorithm = 'kmeans'
+        model = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE)
+    labels = model.fit_predict(scaled)
+    
+    # Silhouette on a fixed sample; undefined unless 2 <= distinct labels < samples
+    silhouettes = None
+    sample = np.arange(len(labels))
+    if len(sample) > SILHOUETTE_SAMPLE_SIZE:
+        rng = np.random.default_rng(RANDOM_STATE)
+        sample = rng.choice(len(labels), SILHOUETTE_SAMPLE_SIZE, replace=False)
+    if 2 <= len(np.unique(labels[sample])) < len(sample):
+        silhouettes = silhouette_samples(scaled[sample], labels[sample])
+    
+    centroids = scaler.inverse_transform(model.cluster_centers_)
+    names = np.array(features['series_names'], dtype=object)
+    cluster_results = []
+    for i in range(n_clusters):
+        members = names[labels == i].tolist()
+        in_sample = labels[sample] == i
+        cluster_silhouette = (round(float(silhouettes[in_sample].mean()), 4)
+                              if silhouettes is not None and in_sample.any() else None)
+        cluster_results.append({
+            'cluster_id': i,
+            'series_count': len(members),
+            'series_names': members[:10],  # Limit to first 10
+            'silhouette': cluster_silhouette,
+            'centroid': {name: round(float(value), 4)
+                         for name, value in zip(features['feature_names'], centroids[i])},
+        })
+    
+    return {
+        'status': 'success',
+        'n_clusters': n_clusters,
+        'algorithm': algorithm,
+        'silhouette_score': round(float(silhouettes.mean()), 4) if silhouettes is not None else None,
+        'series_clustered': len(labels),
+        'excluded_series': features['excluded_series'],
+        'window_end': features['window_end'],
+        'clusters': cluster_results,
+    }
+
+
+class ClusterEngine:
+    """Builds the clustering feature matrix once per data version and reuses it"""
+    
+    def __init__(self, db_manager: DatabaseManager, data_source=None,
+                 window_weeks: int = CLUSTER_WINDOW_WEEKS):
+        self.db_manager = db_manager
+        self.data_source = data_source or db_manager
+        self.window_weeks = window_weeks
+        self._cached = None
+        self._lock = threading.Lock()
+    
+    def features(self) -> Dict:
+        """Feature matrix for the current data, rebuilt only after a load changes it"""
+        version = self.db_manager.data_version
+        with self._lock:
+            if self._cached is None or self._cached[0] != version:
+                with timed_stage('cluster_features'):
+                    self._cached = (version, build_features(self._window_data(), self.window_weeks))
+            return self._cached[1]
+    
+    def cluster(self, n_clusters: int = 3) -> Dict:
+        """Cluster series in-process"""
+        features = self.features()
+        with timed_stage('fit_clusters'):
+            return fit_clusters(features, n_clusters)
+    
+    def _window_data(self) -> pd.DataFrame:
+        """Observations inside the feature window (plus the YoY lookback) only"""
+        latest = self.data_source.get_latest_date()
+        if latest is None:
+            return pd.DataFrame(columns=['series_code', 'series_name', 'date', 'value'])
+        weeks = self.window_weeks + GROWTH_LOOKBACK_WEEKS
+        start = (pd.Timestamp(latest) - pd.Timedelta(weeks=weeks)).strftime('%Y-%m-%d')
+        return self.data_source.get_data(start_date=start,
+                                         columns=['series_code', 'series_name', 'date', 'value'])
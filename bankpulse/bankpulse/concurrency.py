@@ -0,0 +1,116 @@
+"""Bounded executors that keep blocking work off the API event loop"""
+
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+from .config import (API_THREAD_WORKERS, API_PROCESS_WORKERS, API_MAX_INFLIGHT,
+                     API_REQUEST_TIMEOUT)
+
+_pool_lock = threading.Lock()
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+# Blocking calls admitted at once (running plus queued); beyond this requests get a 503
+_inflight = threading.BoundedSemaphore(API_MAX_INFLIGHT)
+
+
+def thread_pool() -> ThreadPoolExecutor:
+    """Shared thread pool for blocking I/O and pandas work"""
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=API_THREAD_WORKERS,
+                                              thread_name_prefix='bankpulse-api')
+        return _thread_pool
+
+
+def process_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared process pool for CPU-heavy analytics, or None when disabled"""
+    global _process_pool
+    if API_PROCESS_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _process_pool is None:
+            # Spawned workers do not inherit the server's threads or open connections
+            _process_pool = ProcessPoolExecutor(max_workers=API_PROCESS_WORKERS,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return _process_pool
+
+
+def shutdown_pools():
+    """Stop the executors (called on application shutdown)"""
+    global _thread_pool, _process_pool
+    with _pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False, cancel_futures=True)
+            _thread_pool = None
+
+
+def _release_slot(future: asyncio.Future):
+    """Free the in-flight slot once the call really finishes, even after a timeout"""
+    _inflight.release()
+    if not future.cancelled():
+        future.exception()
+
+
+async def run_blocking(func: Callable, *args, timeout: float = API_REQUEST_TIMEOUT, **kwargs) -> Any:
+    """Run a blocking call on the thread pool with admission control and a timeout"""
+    if not _inflight.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Server busy, retry later",
+                            headers={"Retry-After": "1"})
+    
+    loop = asyncio.get_running_loop()
+    try:
+        future = loop.run_in_executor(thread_pool(), functools.partial(func, *args, **kwargs))
+    except Exception:
+        _inflight.release()
+        raise
+    future.add_done_callback(_release_slot)
+    
+    try:
+        # Shield so a timeout stops waiting without pretending the thread was cancelled
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Request timed out after {timeout:g}s")
+
+
+def blocking(timeout: float = API_REQUEST_TIMEOUT):
+    """Decorator turning a synchronous endpoint into an async one that runs on the thread pool"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_blocking(func, *args, timeout=timeout, **kwargs)
+        return wrapper
+    return decorator
+
+
+def run_cpu(func: Callable, *args, timeout: float = API_REQUEST_TIMEOUT) -> Any:
+    """Run a picklable CPU-bound function in the process pool from a worker thread"""
+    global _process_pool
+    pool = process_pool()
+    if pool is None:
+        return func(*args)
+    
+    future = pool.submit(func, *args)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise HTTPException(status_code=504, detail=f"Request timed out after {timeout:g}s")
+    except BrokenProcessPool:
+        # A worker died; start a fresh pool for the next request
+        with _pool_lock:
+            if _process_pool is pool:
+                _process_pool = None
+        raise
@@ -19,3 +19,38 @@ DATABASE_PATH = os.getenv('DATABASE_PATH', 'data/bankpulse.db')
 # H8 Data Configuration
 H8_DATA_URL = os.getenv('H8_DATA_URL', 'https://www.federalreserve.gov/datadownload/Output.aspx?rel=H8&filetype=zip')
 DATA_DIR = os.getenv('DATA_DIR', 'data')
+DOWNLOAD_TIMEOUT = float(os.getenv('DOWNLOAD_TIMEOUT', '60'))
+
+# Processes used to parse the downloaded archive (1 parses in the loading process)
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', '1'))
+
+# Series classification rule table (JSON); empty uses the built-in description rules
+SERIES_RULES_PATH = os.getenv('SERIES_RULES_PATH', '')
+
+# Anomaly detection
+ANOMALY_WINDOW = int(os.getenv('ANOMALY_WINDOW', '52'))
+ANOMALY_PERSIST_THRESHOLD = float(os.getenv('ANOMALY_PERSIST_THRESHOLD', '2.0'))
+
+# Growth rates: extra lags (in weeks) materialized alongside WoW/MoM/YoY
+GROWTH_CUSTOM_LAGS = [int(lag) for lag in os.getenv('GROWTH_CUSTOM_LAGS', '13').split(',') if lag.strip()]
+
+# API concurrency: blocking handlers run on a bounded thread pool, CPU-heavy analytics
+# in worker processes (0 runs them on the thread pool instead)
+API_THREAD_WORKERS = int(os.getenv('API_THREAD_WORKERS', '8'))
+API_PROCESS_WORKERS = int(os.getenv('API_PROCESS_WORKERS', '2'))
+API_MAX_INFLIGHT = int(os.getenv('API_MAX_INFLIGHT', '32'))
+API_REQUEST_TIMEOUT = float(os.getenv('API_REQUEST_TIMEOUT', '60'))
+
+# Background download jobs kept for GET /data/download/{job_id}
+JOB_HISTORY_SIZE = int(os.getenv('JOB_HISTORY_SIZE', '50'))
+
+# Response cache for analytics endpoints (entries and total size in MB)
+RESPONSE_CACHE_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', '256'))
+RESPONSE_CACHE_MB = float(os.getenv('RESPONSE_CACHE_MB', '64'))
+
+# Clustering: aligned history window, downsampled shape points, PCA components, and the
+# series count above which MiniBatchKMeans replaces full KMeans
+CLUSTER_WINDOW_WEEKS = int(os.getenv('CLUSTER_WINDOW_WEEKS', '260'))
+CLUSTER_SHAPE_POINTS = int(os.getenv('CLUSTER_SHAPE_POINTS', '26'))
+CLUSTER_PCA_COMPONENTS = int(os.getenv('CLUSTER_PCA_COMPONENTS', '6'))
+CLUSTER_MINIBATCH_THRESHOLD = int(os.getenv('CLUSTER_MINIBATCH_THRESHOLD', '2000'))
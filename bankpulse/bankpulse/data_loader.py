@@ -3,158 +3,560 @@
 import requests
 import zipfile
 import io
+import os
+import re
+import json
+import hashlib
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Union, BinaryIO, Callable, Tuple
+from xml.sax.saxutils import quoteattr
+import numpy as np
 import pandas as pd
-import xml.etree.ElementTree as ET
+from lxml import etree
 
-from .config import H8_DATA_URL, DATA_DIR
-from .database import DatabaseManager
+from .config import H8_DATA_URL, DATA_DIR, SERIES_RULES_PATH, LOAD_WORKERS, DOWNLOAD_TIMEOUT
+from .database import DatabaseManager, DATA_COLUMNS
+from .classification import SeriesClassifier, load_rules, series_attributes
+
+SERIES_TAG = '{*}Series'
+OBS_TAG = '{*}Obs'
+ANNOTATION_TAG = '{*}Annotation'
+
+# Last downloaded archive, kept for conditional GETs and offline re-ingest, with its
+# validators (ETag / Last-Modified) in a JSON sidecar
+ARCHIVE_NAME = 'h8_archive.zip'
+ARCHIVE_METADATA_NAME = 'h8_archive.json'
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Parallel parsing splits archive members into byte ranges at Series boundaries;
+# members smaller than this are not split
+PARSE_SPLIT_MIN_BYTES = 4 * 1024 * 1024
+SCAN_BLOCK_SIZE = 1024 * 1024
+SERIES_START = re.compile(rb'<((?:[\w.-]+:)?Series)[\s>/]')
+
+# Per-process state of parse workers, set once by _init_parse_worker
+_worker_archive = None
+_worker_loader = None
+
+
+@contextmanager
+def open_member(archive: str, member: Optional[str]) -> Iterator[BinaryIO]:
+    """Open a member of a zip archive, or the file itself for a bare XML file (member None)"""
+    if member is None:
+        with open(archive, 'rb') as f:
+            yield f
+    else:
+        with zipfile.ZipFile(archive) as zf, zf.open(member) as f:
+            yield f
+
+
+def _init_parse_worker(archive: str, classifier: SeriesClassifier):
+    """Keep the archive path and a parsing-only loader in the worker process"""
+    global _worker_archive, _worker_loader
+    _worker_archive = archive
+    # Parsing never touches the database
+    _worker_loader = H8DataLoader(None, classifier)
+
+
+def _read_series_range(f: BinaryIO, lo: int, hi: Optional[int], tag: bytes) -> bytes:
+    """Bytes of the Series elements whose start tag begins in [lo, hi) of a member"""
+    pattern = re.compile(b'<' + re.escape(tag) + rb'[\s>/]')
+    close = b'</' + tag + b'>'
+    f.seek(lo)
+    base = lo
+    buffer = bytearray()
+    start = None
+    while True:
+        block = f.read(SCAN_BLOCK_SIZE)
+        buffer += block
+        if start is None:
+            match = pattern.search(buffer)
+            if match is None:
+                if not block:
+                    return b''
+                # Keep only a tail that could hold the start of a split tag
+                keep = len(tag) + 2
+                base += len(buffer) - keep
+                del buffer[:-keep]
+                continue
+            start = match.start()
+            if hi is not None and base + start >= hi:
+                return b''
+        
+        if hi is not None:
+            # The range ends where the next range's first Series starts
+            match = pattern.search(buffer, max(hi - base, start + 1))
+            if match is not None:
+                return bytes(buffer[start:match.start()])
+        if not block:
+            end = buffer.rfind(close)
+            return bytes(buffer[start:end + len(close)]) if end >= start else b''
+
+
+def parse_series_range(member: Optional[str], lo: int, hi: Optional[int], tag: bytes,
+                       namespaces: Dict[str, str]) -> List[Dict]:
+    """Parse one byte range of an archive member to per-series arrays (runs in worker processes)"""
+    with open_member(_worker_archive, member) as f:
+        chunk = _read_series_range(f, lo, hi, tag)
+    if not chunk:
+        return []
+    
+    # Re-declare the document's namespaces around the slice so it parses standalone
+    declarations = ' '.join(f'xmlns:{prefix}={quoteattr(uri)}' if prefix else f'xmlns={quoteattr(uri)}'
+                            for prefix, uri in namespaces.items())
+    wrapped = io.BytesIO(f'<SeriesRange {declarations}>'.encode() + chunk + b'</SeriesRange>')
+    return [s for s in _worker_loader.iter_series(wrapped) if len(s['values'])]
 
 
 class H8DataLoader:
     """Loads and processes H8 data from Federal Reserve"""
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, classifier: Optional[SeriesClassifier] = None,
+                 data_url: str = H8_DATA_URL):
         self.db_manager = db_manager
+        self.classifier = classifier or SeriesClassifier(load_rules(SERIES_RULES_PATH))
+        self.data_url = data_url
         self.data_dir = Path(DATA_DIR)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.archive_path = self.data_dir / ARCHIVE_NAME
+        self._session = None
+    
+    @property
+    def session(self) -> requests.Session:
+        """Pooled HTTP session reused across downloads"""
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session
     
-    def download_data(self) -> bytes:
-        """Download H8 data zip file"""
-        print(f"Downloading H8 data from {H8_DATA_URL}...")
-        response = requests.get(H8_DATA_URL, timeout=60)
-        response.raise_for_status()
-        print("Download complete!")
-        return response.content
+    def download_data(self) -> Dict:
+        """Download the H8 zip file to DATA_DIR, skipping it if the release is unchanged
+        
+        Returns {'path': archive path, 'modified': whether a new archive was fetched}.
+        An interrupted download is resumed with a Range request when the server
+        supports it.
+        """
+        metadata = self._archive_metadata()
+        partial_path = self.archive_path.with_name(ARCHIVE_NAME + '.part')
+        headers = {}
+        
+        # Conditional GET against the cached archive
+        if self.archive_path.exists() and metadata.get('url') == self.data_url:
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                headers['If-Modified-Since'] = metadata['last_modified']
+        
+        # Resume a partial download, but only of the same release
+        partial = metadata.get('partial') or {}
+        validator = partial.get('etag') or partial.get('last_modified')
+        offset = partial_path.stat().st_size if partial_path.exists() else 0
+        if offset and validator and partial.get('url') == self.data_url:
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+        else:
+            offset = 0
+        
+        print(f"Downloading H8 data from {self.data_url}...")
+        with self.session.get(self.data_url, headers=headers, stream=True,
+                              timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 304:
+                print("H8 release unchanged since last download")
+                return {'path': self.archive_path, 'modified': False}
+            if response.status_code == 416 and offset:
+                # The partial file no longer lines up with the release; start over
+                partial_path.unlink()
+                return self.download_data()
+            response.raise_for_status()
+            
+            resumed = response.status_code == 206 and response.headers.get(
+                'Content-Range', '').startswith(f'bytes {offset}-')
+            if response.status_code == 206 and not resumed:
+                raise ValueError(f"Unexpected Content-Range: {response.headers.get('Content-Range')}")
+            
+            validators = {'url': self.data_url,
+                          'etag': response.headers.get('ETag'),
+                          'last_modified': response.headers.get('Last-Modified')}
+            self._save_archive_metadata({**metadata, 'partial': validators})
+            
+            if resumed:
+                print(f"Resuming download at byte {offset}")
+            written = offset if resumed else 0
+            with open(partial_path, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+        
+        if not zipfile.is_zipfile(partial_path):
+            partial_path.unlink()
+            raise ValueError("Downloaded file is not a zip archive")
+        
+        os.replace(partial_path, self.archive_path)
+        self._save_archive_metadata({**validators, 'size': written, 'ingested': False})
+        print(f"Download complete! ({written} bytes)")
+        return {'path': self.archive_path, 'modified': True}
+    
+    def _archive_metadata(self) -> Dict:
+        """Validators and ingest state of the cached archive"""
+        path = self.data_dir / ARCHIVE_METADATA_NAME
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text())
+        except ValueError:
+            return {}
+    
+    def _save_archive_metadata(self, metadata: Dict):
+        path = self.data_dir / ARCHIVE_METADATA_NAME
+        temporary = path.with_name(path.name + '.tmp')
+        temporary.write_text(json.dumps(metadata, indent=2))
+        os.replace(temporary, path)
+    
+    def iter_series(self, source: Union[str, BinaryIO]) -> Iterator[Dict]:
+        """Stream Series elements from an H8 XML file as per-series column arrays"""
+        # Each Series is cleared once read, so memory stays bounded by one series
+        context = etree.iterparse(source, events=('end',), tag=SERIES_TAG,
+                                  huge_tree=True)
+        for _, series in context:
+            series_code = series.get('SERIES_NAME') or 'Unknown'
+            series_desc = self._series_description(series, series_code)
+            # Classified once per series; the observation loop below only collects values
+            attributes = series_attributes(series.attrib)
+            classes = self.classifier.classify(series_code, series_desc, attributes)
+            
+            dates = []
+            values = []
+            for obs in series.iter(OBS_TAG):
+                dates.append(obs.get('TIME_PERIOD'))
+                values.append(obs.get('OBS_VALUE'))
+            
+            # Release the parsed subtree before handing the arrays out
+            series.clear()
+            while series.getprevious() is not None:
+                del series.getparent()[0]
+            
+            dates = self._parse_dates(dates)
+            values = pd.to_numeric(np.array(values, dtype=object), errors='coerce')
+            valid = ~np.isnat(dates) & ~np.isnan(values)
+            
+            yield {
+                'series_code': series_code,
+                'series_name': series_desc,
+                'bank_type': classes['bank_type'],
+                'asset_class': classes['asset_class'],
+                'attributes': attributes,
+                'dates': dates[valid],
+                'values': values[valid].astype(np.float64)
+            }
+    
+    def _member_layout(self, f: BinaryIO) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """Qualified Series tag and namespace declarations preceding the first Series"""
+        head = b''
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            head += block
+            match = SERIES_START.search(head)
+            if match or not block:
+                break
+        if match is None:
+            return None
+        
+        parser = etree.XMLPullParser(events=('start-ns',))
+        parser.feed(head[:match.start()])
+        namespaces = {prefix or '': uri for _, (prefix, uri) in parser.read_events()}
+        return match.group(1), namespaces
+    
+    def _archive_members(self, archive: Path) -> Dict:
+        """XML data members (with uncompressed sizes) and structure member of an archive
+        
+        A bare XML file is treated as an archive with one unnamed (None) member.
+        """
+        if not zipfile.is_zipfile(archive):
+            return {'data': {None: os.path.getsize(archive)}, 'structure': None}
+        with zipfile.ZipFile(archive) as zf:
+            names = zf.namelist()
+            struct_files = [f for f in names if f.lower().endswith('_struct.xml')]
+            return {
+                'data': {f: zf.getinfo(f).file_size for f in names
+                         if f.endswith('.xml') and 'data' in f.lower()},
+                'structure': struct_files[0] if struct_files else None,
+            }
     
-    def parse_xml_data(self, xml_content: str) -> pd.DataFrame:
+    def _parse_parallel(self, archive: Path, xml_files: Dict[Optional[str], int],
+                        workers: int) -> Iterator[Dict]:
+        """Parse archive members on a process pool, yielding series in document order"""
+        tasks = []
+        for xml_file, size in xml_files.items():
+            with open_member(archive, xml_file) as f:
+                layout = self._member_layout(f)
+            if layout is None:
+                continue
+            ranges = max(1, min(workers, size // PARSE_SPLIT_MIN_BYTES))
+            bounds = [size * i // ranges for i in range(ranges)] + [None]
+            tasks.extend((xml_file, lo, hi, *layout) for lo, hi in zip(bounds[:-1], bounds[1:]))
+        if len(tasks) <= 1:
+            # Nothing to split; a pool would only add startup cost
+            yield from self._parse_sequential(archive, xml_files)
+            return
+        print(f"Parsing {len(tasks)} ranges of {len(xml_files)} XML files with {workers} workers")
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_parse_worker,
+                                 initargs=(str(archive), self.classifier)) as pool:
+            futures = [pool.submit(parse_series_range, *task) for task in tasks]
+            for future in futures:
+                yield from future.result()
+    
+    def _parse_sequential(self, archive: Path, xml_files: Dict[Optional[str], int]) -> Iterator[Dict]:
+        """Stream series straight off each archive member in this process"""
+        for xml_file in xml_files:
+            print(f"Processing {xml_file or archive.name}...")
+            with open_member(archive, xml_file) as f:
+                yield from (s for s in self.iter_series(f) if len(s['values']))
+    
+    def _parse_dates(self, dates: List[Optional[str]]) -> np.ndarray:
+        """Parse TIME_PERIOD strings into datetime64[D], normalizing monthly periods"""
+        try:
+            return np.array(dates, dtype='datetime64[D]')
+        except ValueError:
+            parsed = pd.to_datetime(pd.Series(dates, dtype=object), errors='coerce', format='ISO8601')
+            return parsed.to_numpy(dtype='datetime64[D]')
+    
+    def parse_xml_data(self, xml_content: Union[str, bytes, BinaryIO]) -> pd.DataFrame:
         """Parse XML data into DataFrame"""
-        records = []
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode('utf-8')
+        if isinstance(xml_content, bytes):
+            xml_content = io.BytesIO(xml_content)
         
         try:
-            root = ET.fromstring(xml_content)
-            
-            # Find all Series elements
-            series_elements = root.findall('.//{*}Series')
-            
-            print(f"Found {len(series_elements)} series in XML")
-            
-            for series in series_elements:
-                # Get series code
-                series_code = series.get('SERIES_NAME') or 'Unknown'
-                
-                # Get series description from annotations
-                series_desc = series_code
-                annotations = series.findall('.//{*}Annotation')
-                for annotation in annotations:
-                    ann_type = annotation.find('.//{*}AnnotationType')
-                    ann_text = annotation.find('.//{*}AnnotationText')
-                    if ann_type is not None and ann_text is not None:
-                        if 'Short Description' in ann_type.text or 'Long Description' in ann_type.text:
-                            series_desc = ann_text.text
-                            break
-                
-                # Get all observation elements
-                obs_elements = series.findall('.//{*}Obs')
-                
-                for obs in obs_elements:
-                    date = obs.get('TIME_PERIOD')
-                    value = obs.get('OBS_VALUE')
-                    
-                    if date and value:
-                        try:
-                            records.append({
-                                'series_name': series_desc,
-                                'date': date,
-                                'value': float(value),
-                                'bank_type': self._extract_bank_type(series_desc),
-                                'asset_class': self._extract_asset_class(series_desc)
-                            })
-                        except (ValueError, TypeError):
-                            continue
-            
-            print(f"Parsed {len(records)} data points")
-            
-        except ET.ParseError as e:
+            series_list = list(self.iter_series(xml_content))
+        except etree.XMLSyntaxError as e:
             print(f"XML parsing error: {e}")
             raise
         
-        return pd.DataFrame(records)
-    
-    def _extract_bank_type(self, series_desc: str) -> str:
-        """Extract bank type from series description"""
-        desc_lower = series_desc.lower()
-        if 'small' in desc_lower:
-            return 'small'
-        elif 'large' in desc_lower or 'domestically chartered' in desc_lower:
-            return 'large'
-        elif 'foreign' in desc_lower:
-            return 'foreign'
-        return 'all'
-    
-    def _extract_asset_class(self, series_desc: str) -> str:
-        """Extract asset class from series description"""
-        desc_lower = series_desc.lower()
-        if 'commercial and industrial' in desc_lower or 'c&i' in desc_lower:
-            return 'commercial_industrial'
-        elif 'real estate' in desc_lower:
-            return 'real_estate'
-        elif 'consumer' in desc_lower:
-            return 'consumer'
-        elif 'deposit' in desc_lower:
-            return 'deposits'
-        elif 'reserve' in desc_lower:
-            return 'reserves'
-        elif 'loan' in desc_lower:
-            return 'loans'
-        return 'other'
-    
-    def load_and_update(self) -> Dict[str, any]:
-        """Download, parse, and load H8 data into database"""
+        print(f"Found {len(series_list)} series in XML")
+        df = self._series_to_frame(series_list)
+        print(f"Parsed {len(df)} data points")
+        return df
+    
+    def _series_to_frame(self, series_list: List[Dict]) -> pd.DataFrame:
+        """Build a long-format DataFrame from per-series column arrays"""
+        series_list = [s for s in series_list if len(s['values'])]
+        if not series_list:
+            return pd.DataFrame(columns=DATA_COLUMNS)
+        
+        lengths = [len(s['values']) for s in series_list]
+        return pd.DataFrame({
+            'series_name': np.repeat([s['series_name'] for s in series_list], lengths),
+            'date': np.datetime_as_string(np.concatenate([s['dates'] for s in series_list]), unit='D'),
+            'value': np.concatenate([s['values'] for s in series_list]),
+            'bank_type': np.repeat([s['bank_type'] for s in series_list], lengths),
+            'asset_class': np.repeat([s['asset_class'] for s in series_list], lengths),
+            'series_code': np.repeat([s['series_code'] for s in series_list], lengths)
+        })
+    
+    def _series_description(self, series: etree._Element, default: str) -> str:
+        """Get series description from its annotations"""
+        for annotation in series.iter(ANNOTATION_TAG):
+            ann_type = annotation.find('{*}AnnotationType')
+            ann_text = annotation.find('{*}AnnotationText')
+            if ann_type is not None and ann_text is not None and ann_type.text:
+                if 'Short Description' in ann_type.text or 'Long Description' in ann_type.text:
+                    return ann_text.text or default
+        return default
+    
+    def _content_hash(self, dates: np.ndarray, values: np.ndarray) -> str:
+        """Hash a series' observations so revisions can be detected on reload"""
+        digest = hashlib.sha1()
+        digest.update(dates.astype('datetime64[D]').view(np.int64).tobytes())
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+    
+    def _watermark(self, series: Dict) -> Dict:
+        """Build the high-water mark recorded for a fully parsed series"""
+        return {
+            'last_date': str(series['dates'].max()),
+            'content_hash': self._content_hash(series['dates'], series['values'])
+        }
+    
+    def _series_delta(self, series: Dict, watermark: Optional[Dict]) -> Optional[Dict]:
+        """Reduce a parsed series to observations past its high-water mark
+        
+        Returns None when there is no usable mark (first load or revised history);
+        such series are diffed against the stored rows by _diff_stored.
+        """
+        dates, values = series['dates'], series['values']
+        
+        if watermark:
+            seen = dates <= np.datetime64(watermark['last_date'], 'D')
+            if self._content_hash(dates[seen], values[seen]) == watermark['content_hash']:
+                # History unchanged: only the tail past the high-water mark is new
+                return {**series, 'dates': dates[~seen], 'values': values[~seen]}
+        return None
+    
+    def _diff_stored(self, series_list: List[Dict]) -> List[Dict]:
+        """Reduce series to observations that are new or differ from the stored rows"""
+        if not series_list:
+            return []
+        
+        # One query for all series rather than one per series
+        existing = self.db_manager.get_data(series_code=[s['series_code'] for s in series_list],
+                                            columns=['series_code', 'date', 'value'])
+        stored_by_code = {code: rows for code, rows in existing.groupby('series_code', sort=False)}
+        
+        deltas = []
+        for series in series_list:
+            rows = stored_by_code.get(series['series_code'])
+            if rows is None:
+                deltas.append(series)
+                continue
+            dates, values = series['dates'], series['values']
+            stored = pd.Series(rows['value'].to_numpy(),
+                               index=rows['date'].to_numpy(dtype='datetime64[D]'))
+            stored = stored.reindex(dates).to_numpy(dtype=np.float64)
+            changed = np.isnan(stored) | (stored != values)
+            deltas.append({**series, 'dates': dates[changed], 'values': values[changed]})
+        return deltas
+    
+    def reclassify(self) -> Dict[str, int]:
+        """Re-run classification over the stored series without reloading observations"""
+        series = self.db_manager.get_series_metadata()
+        classes = dict(zip([s['series_code'] for s in series], self.classifier.classify_all(series)))
+        changed = self.db_manager.update_classification(classes)
+        return {'series': len(series), 'changed': changed}
+    
+    def load_and_update(self, incremental: bool = True,
+                        progress: Optional[Callable[..., None]] = None,
+                        workers: Optional[int] = None, offline: bool = False,
+                        source: Optional[str] = None) -> Dict[str, any]:
+        """Download, parse, and load H8 data into database
+        
+        In incremental mode only observations newer than each series' high-water
+        mark, or revised since the last load, are written. progress, if given, is
+        called as progress(phase, rows=..., series=..., total=...) as the load advances.
+        With more than one worker the archive is parsed on a process pool. offline
+        re-ingests the cached archive without contacting the server, and source
+        ingests a local zip archive or bare XML file instead.
+        """
+        report = progress or (lambda phase, **counts: None)
+        workers = workers or LOAD_WORKERS
         try:
-            # Download zip file
-            zip_content = self.download_data()
-            
-            # Extract and process XML files
-            all_records = []
-            with zipfile.ZipFile(io.BytesIO(zip_content)) as zf:
-                xml_files = [f for f in zf.namelist() if f.endswith('.xml') and 'data' in f.lower()]
-                print(f"Found {len(xml_files)} XML data files in archive")
-                
-                for xml_file in xml_files:
-                    print(f"Processing {xml_file}...")
-                    with zf.open(xml_file) as f:
-                        xml_content = f.read().decode('utf-8')
-                        df = self.parse_xml_data(xml_content)
-                        if not df.empty:
-                            all_records.append(df)
-            
-            # Combine all dataframes
-            if all_records:
-                combined_df = pd.concat(all_records, ignore_index=True)
-                
-                # Remove duplicates
-                combined_df = combined_df.drop_duplicates(subset=['series_name', 'date'])
-                
-                # Insert into database
-                print(f"Inserting {len(combined_df)} records into database...")
-                self.db_manager.insert_data(combined_df)
-                
-                # Record update
-                self.db_manager.record_update(len(combined_df), 'success')
-                
-                return {
-                    'status': 'success',
-                    'records_added': len(combined_df),
-                    'message': f'Successfully loaded {len(combined_df)} records'
-                }
+            if source or offline:
+                archive_path = Path(source) if source else self.archive_path
+                if not archive_path.exists():
+                    raise FileNotFoundError(f"No archive at {archive_path}")
+            else:
+                # Download zip file
+                report('downloading')
+                download = self.download_data()
+                archive_path = download['path']
+                if (not download['modified'] and incremental
+                        and self._archive_metadata().get('ingested')):
+                    self.db_manager.record_update(0, 'success', changes={})
+                    return {
+                        'status': 'success',
+                        'records_added': 0,
+                        'records_updated': 0,
+                        'message': 'No new H8 release since the last load'
+                    }
+            
+            watermarks = self.db_manager.get_watermarks() if incremental else {}
+            
+            # Extract and process XML files, streaming straight off the archive
+            all_series = []
+            series_metadata = []
+            new_watermarks = {}
+            series_count = 0
+            rows_parsed = 0
+            report('parsing', rows=0, series=0)
+            members = self._archive_members(archive_path)
+            xml_files = members['data']
+            print(f"Found {len(xml_files)} XML data files in {archive_path.name}")
+            
+            # Codelist descriptions let rule tables classify on structure codes
+            if members['structure']:
+                try:
+                    with open_member(archive_path, members['structure']) as f:
+                        self.classifier.load_structure(f)
+                except etree.XMLSyntaxError as e:
+                    print(f"Skipping unreadable {members['structure']}: {e}")
+            
+            if workers > 1:
+                parsed = self._parse_parallel(archive_path, xml_files, workers)
             else:
+                parsed = self._parse_sequential(archive_path, xml_files)
+            
+            unmarked = []
+            for series in parsed:
+                series_count += 1
+                rows_parsed += len(series['values'])
+                report('parsing', rows=rows_parsed, series=series_count)
+                new_watermarks[series['series_code']] = self._watermark(series)
+                series_metadata.append({key: series[key] for key in [
+                    'series_code', 'series_name', 'bank_type', 'asset_class', 'attributes'
+                ]})
+                if incremental:
+                    delta = self._series_delta(series, watermarks.get(series['series_code']))
+                    if delta is None:
+                        unmarked.append(series)
+                        continue
+                    series = delta
+                if len(series['values']):
+                    all_series.append(series)
+            
+            # Series without a usable high-water mark are diffed against stored rows together
+            all_series.extend(s for s in self._diff_stored(unmarked) if len(s['values']))
+            
+            if not series_count:
                 return {
                     'status': 'error',
                     'records_added': 0,
                     'message': 'No data found in archive'
                 }
+            
+            print(f"Parsed {series_count} series, {len(all_series)} with new or revised data")
+            combined_df = self._series_to_frame(all_series)
+            
+            # Remove duplicates
+            combined_df = combined_df.drop_duplicates(subset=['series_code', 'date'])
+            
+            # Metadata for every parsed series, so reclassification never needs a reload
+            self.db_manager.save_series(series_metadata)
+            
+            counts = {'inserted': 0, 'updated': 0}
+            if not combined_df.empty:
+                # Upsert so new observations are added and revised ones replaced
+                print(f"Upserting {len(combined_df)} records into database...")
+                total = len(combined_df)
+                report('writing', rows=0, total=total)
+                counts = self.db_manager.insert_data(
+                    combined_df, progress=lambda rows: report('writing', rows=rows, total=total)
+                )
+            
+            self.db_manager.update_watermarks(new_watermarks)
+            if archive_path == self.archive_path:
+                self._save_archive_metadata({**self._archive_metadata(), 'ingested': True})
+            
+            # Record update; listeners refresh derived tables and the series store
+            report('refreshing')
+            changes = {s['series_code']: str(s['dates'].min()) for s in all_series}
+            self.db_manager.record_update(counts['inserted'], 'success', counts['updated'],
+                                          changes=changes)
+            
+            message = (f"Successfully loaded {counts['inserted']} new and "
+                       f"{counts['updated']} revised records"
+                       if not combined_df.empty else 'Data already up to date')
+            return {
+                'status': 'success',
+                'records_added': counts['inserted'],
+                'records_updated': counts['updated'],
+                'series_updated': len(all_series),
+                'series_unchanged': series_count - len(all_series),
+                'message': message
+            }
         
         except Exception as e:
             error_msg = f"Error loading data: {str(e)}"
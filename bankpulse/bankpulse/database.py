@@ -1,13 +1,123 @@
 """Database management for BankPulse"""
 
 import sqlite3
+import json
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict, List, Union, Callable, Iterator, Tuple
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
-from .config import DATABASE_PATH, DATA_DIR
+from .config import DATABASE_PATH, DATA_DIR, ANOMALY_PERSIST_THRESHOLD
+from .metrics import timed_query
+
+DATA_COLUMNS = ['series_name', 'date', 'value', 'bank_type', 'asset_class', 'series_code']
+UPSERT_BATCH_SIZE = 50000
+
+# Keyset pagination order; series_code breaks ties between series sharing a name
+KEYSET_COLUMNS = ['series_name', 'series_code', 'date']
+STREAM_CHUNK_SIZE = 5000
+
+# Applied on the loading connection; WAL persists for the database file
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+]
+
+# Series migrated from the legacy h8_data table only know their description,
+# so adopt them under the real code the first time it is seen
+SERIES_ADOPT_SQL = """
+    UPDATE series SET code = ?
+    WHERE code = ? AND NOT EXISTS (SELECT 1 FROM series WHERE code = ?)
+"""
+
+SERIES_UPSERT_SQL = """
+    INSERT INTO series (code, description, bank_type, asset_class)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(code) DO UPDATE SET
+        description = excluded.description,
+        bank_type = excluded.bank_type,
+        asset_class = excluded.asset_class
+"""
+
+# Full series metadata from a parse, including the Series element codes kept for reclassification
+SERIES_METADATA_SQL = """
+    INSERT INTO series (code, description, bank_type, asset_class, attributes)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(code) DO UPDATE SET
+        description = excluded.description,
+        bank_type = excluded.bank_type,
+        asset_class = excluded.asset_class,
+        attributes = excluded.attributes
+"""
+
+# Observations are upserted in two passes so each statement's change count splits
+# inserted from updated rows: new keys first, then revised values of existing keys
+OBSERVATION_INSERT_SQL = """
+    INSERT OR IGNORE INTO h8_observations (series_id, date_int, value)
+    VALUES (?, ?, ?)
+"""
+
+# Rows whose values are unchanged are left alone so they do not count as updates
+OBSERVATION_UPDATE_SQL = """
+    UPDATE h8_observations SET value = ?
+    WHERE series_id = ? AND date_int = ? AND value IS NOT ?
+"""
+
+# Latest published load; walks the rowid backwards so it stays a single seek
+DATA_VERSION_SQL = """
+    SELECT id FROM data_updates WHERE status = 'success' AND data_changed
+    ORDER BY id DESC LIMIT 1
+"""
+
+# Row count and date range of h8_observations, advanced by upsert_data in the load's
+# transaction so summaries never scan the observations
+OBSERVATION_TOTALS_SQL = """
+    UPDATE observation_totals SET
+        total_records = total_records + ?,
+        min_date_int = MIN(COALESCE(min_date_int, ?), ?),
+        max_date_int = MAX(COALESCE(max_date_int, ?), ?)
+    WHERE id = 1
+"""
+
+# Tables rebuilt from observations by CreditAnalytics.rebuild_derived
+DERIVED_TABLES = ['growth_rates', 'anomalies', 'anomaly_state', 'flli_history']
+
+# Columns of the materialized weekly FLLI series
+FLLI_COLUMNS = ['flli_score', 'loan_momentum', 'deposit_volatility', 'reserve_trend']
+
+# SQL expression behind each get_data column; dates are stored as YYYYMMDD integers
+DATA_COLUMN_SQL = {
+    'series_name': 's.description',
+    'date': 'o.date_int',
+    'value': 'o.value',
+    'bank_type': 's.bank_type',
+    'asset_class': 's.asset_class',
+    'series_code': 's.code',
+}
+
+
+def date_to_int(date: str) -> int:
+    """Convert an ISO date string to a YYYYMMDD integer"""
+    return int(pd.Timestamp(date).strftime('%Y%m%d'))
+
+
+def dates_to_ints(dates) -> np.ndarray:
+    """Convert ISO date strings or datetime64 values to YYYYMMDD integers"""
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    return (dates.year * 10000 + dates.month * 100 + dates.day).to_numpy(dtype=np.int64)
+
+
+def ints_to_dates(values) -> np.ndarray:
+    """Convert YYYYMMDD integers to ISO date strings"""
+    values = np.asarray(values, dtype=np.int64)
+    years = (values // 10000 - 1970).astype('datetime64[Y]')
+    months = years.astype('datetime64[M]') + (values // 100 % 100 - 1).astype('timedelta64[M]')
+    days = months.astype('datetime64[D]') + (values % 100 - 1).astype('timedelta64[D]')
+    return np.datetime_as_string(days, unit='D')
 
 
 class DatabaseManager:
@@ -18,29 +128,142 @@ class DatabaseManager:
         Path(DATA_DIR).mkdir(parents=True, exist_ok=True)
         self.engine = create_engine(f"sqlite:///{db_path}")
         self.Session = sessionmaker(bind=self.engine)
+        self._update_listeners = []
+        # Id of the load whose listeners are running, published as data_version once they finish
+        self.pending_version = None
+    
+    @property
+    def data_version(self) -> int:
+        """Id of the latest successful load that changed data
+        
+        Read from the database on every call, so loads committed by another process
+        (CLI ingest, other API workers) are seen straight away.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(text(DATA_VERSION_SQL)).scalar() or 0
+    
+    def add_update_listener(self, callback: Callable[[Dict[str, str]], None]):
+        """Register a callback run after each successful data load"""
+        # Callbacks receive {series_code: earliest date written} for the load
+        self._update_listeners.append(callback)
     
     def init_database(self):
         """Initialize database schema"""
         with self.engine.connect() as conn:
             conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS h8_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    series_name TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    value REAL,
+                CREATE TABLE IF NOT EXISTS series (
+                    id INTEGER PRIMARY KEY,
+                    code TEXT NOT NULL UNIQUE,
+                    description TEXT NOT NULL,
                     bank_type TEXT,
-                    asset_class TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(series_name, date)
+                    asset_class TEXT
                 )
             """))
             
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_date ON h8_data(date)
+                CREATE TABLE IF NOT EXISTS h8_observations (
+                    series_id INTEGER NOT NULL REFERENCES series(id),
+                    date_int INTEGER NOT NULL,
+                    value REAL,
+                    PRIMARY KEY (series_id, date_int)
+                ) WITHOUT ROWID
+            """))
+            
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_observations_date ON h8_observations(date_int)
+            """))
+            
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_series_asset_class ON series(asset_class, bank_type)
+            """))
+            
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_series_bank_type ON series(bank_type)
             """))
             
             conn.execute(text("""
-                CREATE INDEX IF NOT EXISTS idx_series ON h8_data(series_name)
+                CREATE INDEX IF NOT EXISTS idx_series_description ON series(description)
+            """))
+            
+            # Walk series in keyset order so paged reads need no sort; being unique,
+            # each (description, code) group is one series already ordered by date_int
+            conn.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_series_keyset ON series(description, code)
+            """))
+            
+            legacy = conn.execute(text(
+                "SELECT type FROM sqlite_master WHERE name = 'h8_data'"
+            )).scalar()
+            if legacy == 'table':
+                self._migrate_legacy_data(conn)
+            
+            # Denormalized view for ad-hoc queries against the old layout
+            conn.execute(text("""
+                CREATE VIEW IF NOT EXISTS h8_data AS
+                SELECT s.description AS series_name,
+                       printf('%04d-%02d-%02d', o.date_int / 10000,
+                              o.date_int / 100 % 100, o.date_int % 100) AS date,
+                       o.value, s.bank_type, s.asset_class, s.code AS series_code
+                FROM h8_observations o
+                JOIN series s ON s.id = o.series_id
+            """))
+            
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS growth_rates (
+                    series_id INTEGER NOT NULL REFERENCES series(id),
+                    lag INTEGER NOT NULL,
+                    date_int INTEGER NOT NULL,
+                    lag_value REAL,
+                    change REAL,
+                    PRIMARY KEY (series_id, lag, date_int)
+                ) WITHOUT ROWID
+            """))
+            
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS anomalies (
+                    method TEXT NOT NULL,
+                    window_size INTEGER NOT NULL,
+                    series_id INTEGER NOT NULL REFERENCES series(id),
+                    date_int INTEGER NOT NULL,
+                    z_score REAL NOT NULL,
+                    PRIMARY KEY (method, window_size, series_id, date_int)
+                ) WITHOUT ROWID
+            """))
+            
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_anomalies_date ON anomalies(method, window_size, date_int)
+            """))
+            
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS anomaly_state (
+                    method TEXT NOT NULL,
+                    window_size INTEGER NOT NULL,
+                    series_id INTEGER NOT NULL REFERENCES series(id),
+                    last_date TEXT NOT NULL,
+                    mean REAL,
+                    mean_sq REAL,
+                    count INTEGER,
+                    PRIMARY KEY (method, window_size, series_id)
+                )
+            """))
+            
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS flli_history (
+                    date_int INTEGER PRIMARY KEY,
+                    flli_score REAL NOT NULL,
+                    loan_momentum REAL,
+                    deposit_volatility REAL,
+                    reserve_trend REAL
+                )
+            """))
+            
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS series_watermarks (
+                    series_code TEXT PRIMARY KEY,
+                    last_date TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
             """))
             
             conn.execute(text("""
@@ -51,45 +274,749 @@ class DatabaseManager:
                     status TEXT
                 )
             """))
+            
+            # Databases created before updated-row counts were tracked
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(data_updates)"))]
+            if 'records_updated' not in columns:
+                conn.execute(text(
+                    "ALTER TABLE data_updates ADD COLUMN records_updated INTEGER DEFAULT 0"
+                ))
+            
+            # Databases created before loads that changed nothing were told apart
+            if 'data_changed' not in columns:
+                conn.execute(text(
+                    "ALTER TABLE data_updates ADD COLUMN data_changed INTEGER DEFAULT 1"
+                ))
+            
+            # Databases created before series codes were stored for reclassification
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(series)"))]
+            if 'attributes' not in columns:
+                conn.execute(text("ALTER TABLE series ADD COLUMN attributes TEXT"))
+            
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS observation_totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_records INTEGER NOT NULL,
+                    min_date_int INTEGER,
+                    max_date_int INTEGER
+                )
+            """))
+            
+            # Databases loaded before the totals were kept are counted once here
+            if conn.execute(text("SELECT 1 FROM observation_totals")).fetchone() is None:
+                conn.execute(text("""
+                    INSERT INTO observation_totals (id, total_records, min_date_int, max_date_int)
+                    SELECT 1, COUNT(*), MIN(date_int), MAX(date_int) FROM h8_observations
+                """))
+            conn.commit()
+    
+    def _migrate_legacy_data(self, conn):
+        """Move rows from the old denormalized h8_data table into series/h8_observations"""
+        print("Migrating h8_data to normalized series/observation tables...")
+        conn.execute(text("""
+            INSERT OR IGNORE INTO series (code, description, bank_type, asset_class)
+            SELECT series_name, series_name, MAX(bank_type), MAX(asset_class)
+            FROM h8_data
+            GROUP BY series_name
+        """))
+        conn.execute(text("""
+            INSERT OR IGNORE INTO h8_observations (series_id, date_int, value)
+            SELECT s.id,
+                   CAST(REPLACE(CASE WHEN length(d.date) = 7 THEN d.date || '-01'
+                                     ELSE d.date END, '-', '') AS INTEGER),
+                   d.value
+            FROM h8_data d
+            JOIN series s ON s.code = d.series_name
+        """))
+        conn.execute(text("DROP TABLE h8_data"))
+    
+    def insert_data(self, df: pd.DataFrame,
+                    progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """Insert H8 data into database, updating rows that already exist"""
+        return self.upsert_data(df, progress=progress)
+    
+    def upsert_data(self, df: pd.DataFrame, batch_size: int = UPSERT_BATCH_SIZE,
+                    progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """Bulk upsert H8 rows keyed on (series, date) in a single transaction
+        
+        progress, if given, is called with the number of rows written after each batch.
+        """
+        if df.empty:
+            return {'inserted': 0, 'updated': 0}
+        
+        if 'series_code' not in df.columns:
+            df = df.assign(series_code=df['series_name'])
+        
+        raw = self.engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            cursor = conn.cursor()
+            for pragma in BULK_LOAD_PRAGMAS:
+                cursor.execute(pragma)
+            
+            # Series dimension first, so observations can reference integer ids
+            series = df.drop_duplicates('series_code')
+            codes = series['series_code'].tolist()
+            cursor.executemany(SERIES_ADOPT_SQL, zip(codes, series['series_name'].tolist(), codes))
+            cursor.executemany(SERIES_UPSERT_SQL, zip(
+                codes,
+                series['series_name'].tolist(),
+                series['bank_type'].tolist(),
+                series['asset_class'].tolist()
+            ))
+            series_ids = dict(cursor.execute("SELECT code, id FROM series").fetchall())
+            
+            ids = df['series_code'].map(series_ids).to_numpy(dtype=np.int64).tolist()
+            date_ints = dates_to_ints(df['date'])
+            first, last = int(date_ints.min()), int(date_ints.max())
+            dates = date_ints.tolist()
+            values = df['value'].tolist()
+            
+            inserted = updated = 0
+            for start in range(0, len(df), batch_size):
+                end = start + batch_size
+                batch = list(zip(ids[start:end], dates[start:end], values[start:end]))
+                changes_before = conn.total_changes
+                cursor.executemany(OBSERVATION_INSERT_SQL, batch)
+                batch_inserted = conn.total_changes - changes_before
+                inserted += batch_inserted
+                if batch_inserted < len(batch):
+                    # Only batches touching stored keys pay for the second pass
+                    changes_before = conn.total_changes
+                    cursor.executemany(OBSERVATION_UPDATE_SQL,
+                                       [(value, series_id, date, value) for series_id, date, value in batch])
+                    updated += conn.total_changes - changes_before
+                if progress:
+                    progress(min(end, len(df)))
+            cursor.execute(OBSERVATION_TOTALS_SQL, (inserted, first, first, last, last))
             conn.commit()
+            
+            # Refresh planner statistics so series filters drive the join
+            cursor.execute("PRAGMA optimize")
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        
+        return {'inserted': inserted, 'updated': updated}
     
-    def insert_data(self, df: pd.DataFrame):
-        """Insert H8 data into database"""
-        df.to_sql('h8_data', self.engine, if_exists='append', index=False)
+    def save_series(self, series: List[Dict]):
+        """Upsert series metadata (code, name, classification and Series codes)"""
+        if not series:
+            return
+        
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.driver_connection.cursor()
+            codes = [s['series_code'] for s in series]
+            cursor.executemany(SERIES_ADOPT_SQL, zip(codes, [s['series_name'] for s in series], codes))
+            cursor.executemany(SERIES_METADATA_SQL, [
+                (s['series_code'], s['series_name'], s['bank_type'], s['asset_class'],
+                 json.dumps(s.get('attributes') or {}, sort_keys=True))
+                for s in series
+            ])
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+    
+    def get_series_metadata(self) -> List[Dict]:
+        """Stored series with their classification and Series codes"""
+        with self.engine.connect() as conn:
+            result = conn.execute(text(
+                "SELECT code, description, bank_type, asset_class, attributes FROM series ORDER BY id"
+            ))
+            return [
+                {'series_code': row[0], 'series_name': row[1], 'bank_type': row[2],
+                 'asset_class': row[3], 'attributes': json.loads(row[4]) if row[4] else {}}
+                for row in result
+            ]
     
-    def get_data(self, series_name: Optional[str] = None, 
+    def update_classification(self, classes: Dict[str, Dict[str, str]]) -> int:
+        """Set bank_type/asset_class per series code, returning how many series changed"""
+        if not classes:
+            return 0
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                text("""
+                    UPDATE series SET bank_type = :bank_type, asset_class = :asset_class
+                    WHERE code = :series_code
+                      AND (bank_type IS NOT :bank_type OR asset_class IS NOT :asset_class)
+                """),
+                [{'series_code': code, **fields} for code, fields in classes.items()]
+            )
+            conn.commit()
+            return result.rowcount
+    
+    def get_watermarks(self) -> Dict[str, Dict]:
+        """Get per-series ingest high-water marks keyed by series code"""
+        with self.engine.connect() as conn:
+            result = conn.execute(text(
+                "SELECT series_code, last_date, content_hash FROM series_watermarks"
+            ))
+            return {
+                row[0]: {'last_date': row[1], 'content_hash': row[2]}
+                for row in result
+            }
+    
+    def update_watermarks(self, watermarks: Dict[str, Dict]):
+        """Record the latest loaded date and content hash for each series"""
+        if not watermarks:
+            return
+        with self.engine.connect() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO series_watermarks (series_code, last_date, content_hash)
+                    VALUES (:series_code, :last_date, :content_hash)
+                    ON CONFLICT(series_code) DO UPDATE SET
+                        last_date = excluded.last_date,
+                        content_hash = excluded.content_hash,
+                        updated_at = CURRENT_TIMESTAMP
+                """),
+                [{'series_code': code, **mark} for code, mark in watermarks.items()]
+            )
+            conn.commit()
+    
+    def get_growth_rate_series(self) -> set:
+        """Codes of series that already have materialized growth rates"""
+        with self.engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT s.code FROM series s
+                WHERE EXISTS (SELECT 1 FROM growth_rates g WHERE g.series_id = s.id)
+            """))
+            return {row[0] for row in result}
+    
+    def save_growth_rates(self, df: pd.DataFrame, lags: List[int],
+                          since: Optional[Dict[str, str]] = None):
+        """Write materialized growth rates from value_lag_{n}w / change_{n}w columns
+        
+        Series in since have their stored rows replaced from that date on; every
+        other series in df must have no stored rows yet (first load or rebuild).
+        """
+        since = since or {}
+        raw = self.engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            cursor = conn.cursor()
+            series_ids = dict(cursor.execute("SELECT code, id FROM series").fetchall())
+            cursor.executemany(
+                "DELETE FROM growth_rates WHERE series_id = ? AND date_int >= ?",
+                [(series_ids[code], date_to_int(date)) for code, date in since.items() if code in series_ids]
+            )
+            
+            if not df.empty:
+                ids = df['series_code'].map(series_ids).to_numpy(dtype=np.int64)
+                dates = dates_to_ints(df['date'])
+                frames = []
+                for lag in lags:
+                    lagged = df[f'value_lag_{lag}w'].to_numpy(dtype=np.float64)
+                    present = ~np.isnan(lagged)
+                    frames.append(pd.DataFrame({
+                        'series_id': ids[present],
+                        'lag': lag,
+                        'date_int': dates[present],
+                        'lag_value': lagged[present],
+                        # NaN binds as NULL
+                        'change': df[f'change_{lag}w'].to_numpy(dtype=np.float64)[present],
+                    }))
+                # Primary-key order turns the insert into appends to the WITHOUT ROWID tree
+                rows = pd.concat(frames, ignore_index=True).sort_values(
+                    ['series_id', 'lag', 'date_int'], kind='stable'
+                )
+                cursor.executemany(
+                    """
+                    INSERT INTO growth_rates (series_id, lag, date_int, lag_value, change)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    zip(*(rows[column].tolist() for column in rows.columns))
+                )
+            conn.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+    
+    @timed_query('database')
+    def get_growth_rates(self, lags: Dict[int, str],
+                         series_name: Optional[Union[str, List[str]]] = None,
+                         start_date: Optional[str] = None,
+                         end_date: Optional[str] = None,
+                         require_lag: Optional[int] = None) -> pd.DataFrame:
+        """Read observations joined with their materialized growth rates, one column pair per lag"""
+        lag_columns = ', '.join(
+            f"MAX(CASE WHEN g.lag = {int(lag)} THEN g.lag_value END) AS value_lag_{int(lag)}w, "
+            f"MAX(CASE WHEN g.lag = {int(lag)} THEN g.change END) AS {name}_change"
+            for lag, name in lags.items()
+        )
+        query = f"""
+            SELECT s.description AS series_name, o.date_int, o.value,
+                   s.bank_type, s.asset_class, s.code AS series_code, {lag_columns}
+            FROM h8_observations o
+            JOIN series s ON s.id = o.series_id
+            {'JOIN' if require_lag else 'LEFT JOIN'} growth_rates g
+              ON g.series_id = o.series_id AND g.date_int = o.date_int
+            WHERE 1=1
+        """
+        params = {}
+        query += self._filter_clause('s.description', 'series_name', series_name, params)
+        
+        if start_date:
+            query += " AND o.date_int >= :start_date"
+            params['start_date'] = date_to_int(start_date)
+        
+        if end_date:
+            query += " AND o.date_int <= :end_date"
+            params['end_date'] = date_to_int(end_date)
+        
+        query += " GROUP BY o.series_id, o.date_int"
+        if require_lag:
+            query += f" HAVING MAX(CASE WHEN g.lag = {int(require_lag)} THEN g.change END) IS NOT NULL"
+        query += " ORDER BY o.date_int, o.series_id"
+        
+        df = pd.read_sql(text(query), self.engine, params=params)
+        df.insert(1, 'date', ints_to_dates(df.pop('date_int')))
+        return df
+    
+    def clear_derived(self):
+        """Drop all materialized analytics so they can be rebuilt from scratch"""
+        with self.engine.connect() as conn:
+            for table in DERIVED_TABLES:
+                conn.execute(text(f"DELETE FROM {table}"))
+            conn.commit()
+    
+    def get_anomaly_state(self, method: str, window: int) -> Dict[str, Dict]:
+        """Get running anomaly statistics for a method, keyed by series code"""
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                text("""
+                    SELECT s.code, a.last_date, a.mean, a.mean_sq, a.count
+                    FROM anomaly_state a
+                    JOIN series s ON s.id = a.series_id
+                    WHERE a.method = :method AND a.window_size = :window
+                """),
+                {'method': method, 'window': window}
+            )
+            return {
+                row[0]: {'last_date': row[1], 'mean': row[2], 'mean_sq': row[3], 'count': row[4]}
+                for row in result
+            }
+    
+    def save_anomalies(self, method: str, window: int, since: Dict[str, Optional[str]],
+                       scores: pd.DataFrame, state: Dict[str, Dict]):
+        """Replace persisted anomalies from each series' since date and save running state"""
+        scores = scores[scores['z_score'] >= ANOMALY_PERSIST_THRESHOLD]
+        with self.engine.connect() as conn:
+            conn.execute(
+                text("""
+                    DELETE FROM anomalies
+                    WHERE method = :method AND window_size = :window AND date_int >= :since
+                      AND series_id = (SELECT id FROM series WHERE code = :code)
+                """),
+                [{'method': method, 'window': window, 'code': code,
+                  'since': date_to_int(date) if date else 0} for code, date in since.items()]
+            )
+            if not scores.empty:
+                conn.execute(
+                    text("""
+                        INSERT OR REPLACE INTO anomalies (method, window_size, series_id, date_int, z_score)
+                        SELECT :method, :window, id, :date_int, :z_score FROM series WHERE code = :code
+                    """),
+                    [{'method': method, 'window': window, 'code': code, 'date_int': date_int,
+                      'z_score': z_score}
+                     for code, date_int, z_score in zip(scores['series_code'].tolist(),
+                                                        dates_to_ints(scores['date']).tolist(),
+                                                        scores['z_score'].tolist())]
+                )
+            if state:
+                conn.execute(
+                    text("""
+                        INSERT INTO anomaly_state (method, window_size, series_id, last_date, mean, mean_sq, count)
+                        SELECT :method, :window, id, :last_date, :mean, :mean_sq, :count
+                        FROM series WHERE code = :code
+                        ON CONFLICT(method, window_size, series_id) DO UPDATE SET
+                            last_date = excluded.last_date,
+                            mean = excluded.mean,
+                            mean_sq = excluded.mean_sq,
+                            count = excluded.count
+                    """),
+                    [{'method': method, 'window': window, 'code': code,
+                      'last_date': values['last_date'], 'mean': values.get('mean'),
+                      'mean_sq': values.get('mean_sq'), 'count': values.get('count')}
+                     for code, values in state.items()]
+                )
+            conn.commit()
+    
+    @timed_query('database')
+    def get_anomalies(self, method: str, window: int, threshold: float,
+                      start_date: Optional[str] = None,
+                      end_date: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Read persisted anomalies, or None if the method has not been scored yet"""
+        with self.engine.connect() as conn:
+            scored = conn.execute(
+                text("SELECT 1 FROM anomaly_state WHERE method = :method AND window_size = :window LIMIT 1"),
+                {'method': method, 'window': window}
+            ).fetchone()
+        if not scored or threshold < ANOMALY_PERSIST_THRESHOLD:
+            return None
+        
+        query = """
+            SELECT s.description AS series_name, a.date_int, o.value,
+                   s.bank_type, s.asset_class, s.code AS series_code, a.z_score
+            FROM anomalies a
+            JOIN h8_observations o ON o.series_id = a.series_id AND o.date_int = a.date_int
+            JOIN series s ON s.id = a.series_id
+            WHERE a.method = :method AND a.window_size = :window AND a.z_score > :threshold
+        """
+        params = {'method': method, 'window': window, 'threshold': threshold}
+        
+        if start_date:
+            query += " AND a.date_int >= :start_date"
+            params['start_date'] = date_to_int(start_date)
+        
+        if end_date:
+            query += " AND a.date_int <= :end_date"
+            params['end_date'] = date_to_int(end_date)
+        
+        query += " ORDER BY a.date_int, a.series_id"
+        
+        df = pd.read_sql(text(query), self.engine, params=params)
+        df.insert(1, 'date', ints_to_dates(df.pop('date_int')))
+        df['is_anomaly'] = True
+        return df
+    
+    def save_flli_history(self, df: pd.DataFrame, since: Optional[str] = None):
+        """Replace weekly FLLI values (date plus FLLI_COLUMNS) from since on, or all of them"""
+        rows = zip(dates_to_ints(df['date']).tolist(),
+                   *[[None if pd.isna(v) else v for v in df[column].tolist()] for column in FLLI_COLUMNS])
+        with self.engine.connect() as conn:
+            # Weeks that no longer have a full window must not linger from earlier loads
+            conn.execute(text("DELETE FROM flli_history WHERE date_int >= :since"),
+                         {'since': date_to_int(since) if since else 0})
+            if not df.empty:
+                conn.execute(
+                    text(f"""
+                        INSERT INTO flli_history (date_int, {', '.join(FLLI_COLUMNS)})
+                        VALUES (:date_int, {', '.join(':' + column for column in FLLI_COLUMNS)})
+                    """),
+                    [dict(zip(['date_int'] + FLLI_COLUMNS, row)) for row in rows]
+                )
+            conn.commit()
+    
+    @timed_query('database')
+    def get_flli_history(self, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None,
+                         latest: bool = False) -> pd.DataFrame:
+        """Read the materialized weekly FLLI series (or only its latest row up to end_date)"""
+        query = f"SELECT date_int, {', '.join(FLLI_COLUMNS)} FROM flli_history WHERE 1=1"
+        params = {}
+        
+        if start_date:
+            query += " AND date_int >= :start_date"
+            params['start_date'] = date_to_int(start_date)
+        
+        if end_date:
+            query += " AND date_int <= :end_date"
+            params['end_date'] = date_to_int(end_date)
+        
+        query += " ORDER BY date_int DESC LIMIT 1" if latest else " ORDER BY date_int"
+        
+        df = pd.read_sql(text(query), self.engine, params=params)
+        df.insert(0, 'date', ints_to_dates(df.pop('date_int')))
+        return df
+    
+    @timed_query('database')
+    def get_data(self, series_name: Optional[Union[str, List[str]]] = None, 
+                 start_date: Optional[str] = None,
+                 end_date: Optional[str] = None,
+                 series_code: Optional[Union[str, List[str]]] = None,
+                 asset_class: Optional[Union[str, List[str]]] = None,
+                 bank_type: Optional[Union[str, List[str]]] = None,
+                 columns: Optional[List[str]] = None,
+                 order_by: Optional[List[str]] = None,
+                 descending: bool = False,
+                 limit: Optional[int] = None) -> pd.DataFrame:
+        """Query H8 data from database, applying filters, ordering and limit in SQL"""
+        columns = columns or DATA_COLUMNS
+        query, params = self._data_query(columns, series_name, start_date, end_date, series_code,
+                                         asset_class, bank_type, order_by, descending, limit)
+        df = pd.read_sql(text(query), self.engine, params=params)
+        return self._with_dates(df, columns)
+    
+    @timed_query('database')
+    def get_page(self, limit: Optional[int],
+                 after: Optional[Tuple[str, str, str]] = None,
+                 series_name: Optional[Union[str, List[str]]] = None,
                  start_date: Optional[str] = None,
-                 end_date: Optional[str] = None) -> pd.DataFrame:
-        """Query H8 data from database"""
-        query = "SELECT * FROM h8_data WHERE 1=1"
+                 end_date: Optional[str] = None,
+                 series_code: Optional[Union[str, List[str]]] = None,
+                 asset_class: Optional[Union[str, List[str]]] = None,
+                 bank_type: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
+        """Next page of observations in keyset order, starting after (series_name, series_code, date)"""
+        query, params = self._data_query(DATA_COLUMNS, series_name, start_date, end_date, series_code,
+                                         asset_class, bank_type, KEYSET_COLUMNS, False, limit, after)
+        df = pd.read_sql(text(query), self.engine, params=params)
+        return self._with_dates(df, DATA_COLUMNS)
+    
+    @timed_query('database')
+    def get_tails(self, since: Dict[str, str], lookback: int,
+                  columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Observations of each series from its since date on, plus the lookback observations before it
+        
+        Lookback is counted in observations rather than calendar time, so weekly and
+        monthly series both get enough history for lag- and window-based statistics.
+        """
+        columns = columns or DATA_COLUMNS
+        unknown = set(columns) - set(DATA_COLUMN_SQL)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        if not since:
+            return pd.DataFrame(columns=columns)
+        
+        select = ', '.join(
+            f"{DATA_COLUMN_SQL[column]} AS {'date_int' if column == 'date' else column}"
+            for column in columns
+        )
+        # One primary-key seek per series finds the date lookback observations back
+        start = "j.value"
+        if lookback > 0:
+            start = """COALESCE((
+                SELECT p.date_int FROM h8_observations p
+                WHERE p.series_id = s.id AND p.date_int < j.value
+                ORDER BY p.date_int DESC LIMIT 1 OFFSET :offset
+            ), 0)"""
+        query = f"""
+            SELECT {select}
+            FROM json_each(:since) j
+            JOIN series s ON s.code = j.key
+            JOIN h8_observations o ON o.series_id = s.id
+            WHERE o.date_int >= {start}
+            ORDER BY s.code, o.date_int
+        """
+        params = {
+            'since': json.dumps({code: date_to_int(date) for code, date in since.items()}),
+            'offset': int(lookback) - 1,
+        }
+        df = pd.read_sql(text(query), self.engine, params=params)
+        return self._with_dates(df, columns)
+        
+    def iter_data(self, limit: Optional[int] = None,
+                  after: Optional[Tuple[str, str, str]] = None,
+                  series_name: Optional[Union[str, List[str]]] = None,
+                  start_date: Optional[str] = None,
+                  end_date: Optional[str] = None,
+                  series_code: Optional[Union[str, List[str]]] = None,
+                  asset_class: Optional[Union[str, List[str]]] = None,
+                  bank_type: Optional[Union[str, List[str]]] = None,
+                  chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """Stream observations in keyset order as DataFrame chunks from a server-side cursor"""
+        query, params = self._data_query(DATA_COLUMNS, series_name, start_date, end_date, series_code,
+                                         asset_class, bank_type, KEYSET_COLUMNS, False, limit, after)
+        keys = ['date_int' if column == 'date' else column for column in DATA_COLUMNS]
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text(query), params)
+            for rows in result.partitions(chunk_size):
+                yield self._with_dates(pd.DataFrame.from_records(rows, columns=keys), DATA_COLUMNS)
+    
+    def _data_query(self, columns: List[str],
+                    series_name: Optional[Union[str, List[str]]],
+                    start_date: Optional[str],
+                    end_date: Optional[str],
+                    series_code: Optional[Union[str, List[str]]],
+                    asset_class: Optional[Union[str, List[str]]],
+                    bank_type: Optional[Union[str, List[str]]],
+                    order_by: Optional[List[str]],
+                    descending: bool,
+                    limit: Optional[int],
+                    after: Optional[Tuple[str, str, str]] = None) -> Tuple[str, Dict]:
+        """Build the observations query shared by get_data, get_page and iter_data"""
+        unknown = set(columns).union(order_by or []) - set(DATA_COLUMN_SQL)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        
+        select = ', '.join(
+            f"{DATA_COLUMN_SQL[column]} AS {'date_int' if column == 'date' else column}"
+            for column in columns
+        )
+        if order_by == KEYSET_COLUMNS and not descending:
+            # Drive the join from series in keyset order so LIMIT stops the scan early
+            source = """
+                FROM series s INDEXED BY idx_series_keyset
+                CROSS JOIN h8_observations o
+                WHERE o.series_id = s.id
+            """
+        else:
+            source = """
+                FROM h8_observations o
+                JOIN series s ON s.id = o.series_id
+                WHERE 1=1
+            """
+        query = f"SELECT {select} {source}"
         params = {}
         
-        if series_name:
-            query += " AND series_name = :series_name"
-            params['series_name'] = series_name
+        for column, value in (('series_name', series_name), ('series_code', series_code),
+                              ('asset_class', asset_class), ('bank_type', bank_type)):
+            query += self._filter_clause(DATA_COLUMN_SQL[column], column, value, params)
         
         if start_date:
-            query += " AND date >= :start_date"
-            params['start_date'] = start_date
+            query += " AND o.date_int >= :start_date"
+            params['start_date'] = date_to_int(start_date)
         
         if end_date:
-            query += " AND date <= :end_date"
-            params['end_date'] = end_date
+            query += " AND o.date_int <= :end_date"
+            params['end_date'] = date_to_int(end_date)
+        
+        if after:
+            # The two-column bound lets the series scan seek straight to the cursor
+            query += (" AND (s.description, s.code) >= (:after_name, :after_code)"
+                      " AND (s.description, s.code, o.date_int) > (:after_name, :after_code, :after_date)")
+            params['after_name'], params['after_code'] = after[0], after[1]
+            params['after_date'] = date_to_int(after[2])
         
-        return pd.read_sql(query, self.engine, params=params)
+        if order_by:
+            direction = ' DESC' if descending else ''
+            query += " ORDER BY " + ', '.join(DATA_COLUMN_SQL[column] + direction for column in order_by)
+        
+        if limit is not None:
+            query += " LIMIT :limit"
+            params['limit'] = int(limit)
+        
+        return query, params
+    
+    def _with_dates(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """Replace the date_int column with ISO date strings"""
+        if 'date' in columns:
+            df.insert(columns.index('date'), 'date', ints_to_dates(df.pop('date_int')))
+        return df
+    
+    def _filter_clause(self, column_sql: str, name: str,
+                       value: Optional[Union[str, List[str]]], params: Dict) -> str:
+        """Build an equality or IN clause for a single value or list filter"""
+        if value is None or (isinstance(value, str) and not value):
+            return ""
+        if isinstance(value, str):
+            params[name] = value
+            return f" AND {column_sql} = :{name}"
+        
+        values = list(value)
+        if not values:
+            return " AND 0"
+        names = [f"{name}_{i}" for i in range(len(values))]
+        params.update(zip(names, values))
+        return f" AND {column_sql} IN ({', '.join(':' + n for n in names)})"
+    
+    @timed_query('database')
+    def get_series(self, asset_class: Optional[Union[str, List[str]]] = None,
+                   bank_type: Optional[Union[str, List[str]]] = None,
+                   start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> pd.DataFrame:
+        """List series with their observation counts and date range"""
+        query = """
+            SELECT s.description AS series_name, s.code AS series_code,
+                   s.bank_type, s.asset_class,
+                   COUNT(*) AS observations,
+                   MIN(o.date_int) AS first_date_int,
+                   MAX(o.date_int) AS last_date_int
+            FROM series s
+            JOIN h8_observations o ON o.series_id = s.id
+            WHERE 1=1
+        """
+        params = {}
+        query += self._filter_clause('s.asset_class', 'asset_class', asset_class, params)
+        query += self._filter_clause('s.bank_type', 'bank_type', bank_type, params)
+        
+        if start_date:
+            query += " AND o.date_int >= :start_date"
+            params['start_date'] = date_to_int(start_date)
+        
+        if end_date:
+            query += " AND o.date_int <= :end_date"
+            params['end_date'] = date_to_int(end_date)
+        
+        query += " GROUP BY s.id ORDER BY observations DESC, s.id"
+        
+        df = pd.read_sql(text(query), self.engine, params=params)
+        df['first_date'] = ints_to_dates(df.pop('first_date_int'))
+        df['last_date'] = ints_to_dates(df.pop('last_date_int'))
+        return df
+    
+    def get_summary(self) -> Dict:
+        """Record count and date range from the kept totals, plus distinct series/asset classes/bank types"""
+        with self.engine.connect() as conn:
+            # Kept current by upsert_data, so no scan of the observations
+            total, min_date, max_date = conn.execute(text(
+                "SELECT total_records, min_date_int, max_date_int FROM observation_totals"
+            )).fetchone()
+            
+            # Series-level facts only need one primary-key probe per series
+            loaded = """
+                FROM series s
+                WHERE EXISTS (SELECT 1 FROM h8_observations o WHERE o.series_id = s.id)
+            """
+            series_count = conn.execute(text(f"SELECT COUNT(DISTINCT s.description) {loaded}")).scalar()
+            asset_classes = [row[0] for row in conn.execute(text(
+                f"SELECT s.asset_class {loaded} GROUP BY s.asset_class ORDER BY MIN(s.id)"
+            ))]
+            bank_types = [row[0] for row in conn.execute(text(
+                f"SELECT s.bank_type {loaded} GROUP BY s.bank_type ORDER BY MIN(s.id)"
+            ))]
+        
+        return {
+            'total_records': total,
+            'date_range': {
+                'min': str(ints_to_dates([min_date])[0]) if min_date else None,
+                'max': str(ints_to_dates([max_date])[0]) if max_date else None,
+            },
+            'series_count': series_count,
+            'asset_classes': asset_classes,
+            'bank_types': bank_types,
+        }
     
     def get_latest_date(self) -> Optional[str]:
         """Get the latest date in the database"""
         with self.engine.connect() as conn:
-            result = conn.execute(text("SELECT MAX(date) as max_date FROM h8_data"))
+            result = conn.execute(text("SELECT MAX(date_int) as max_date FROM h8_observations"))
             row = result.fetchone()
-            return row[0] if row else None
+            return str(ints_to_dates([row[0]])[0]) if row and row[0] else None
     
-    def record_update(self, records_added: int, status: str):
-        """Record data update information"""
+    def record_update(self, records_added: int, status: str, records_updated: int = 0,
+                      changes: Optional[Dict[str, str]] = None):
+        """Record data update information and notify listeners of successful loads
+        
+        A successful load that changed data becomes the new data_version only after
+        its listeners have run, so results cached under that version see refreshed
+        derived tables; a load that changed nothing keeps cached results valid.
+        """
+        changed = status == 'success' and (changes is None or bool(changes))
         with self.engine.connect() as conn:
-            conn.execute(
-                text("INSERT INTO data_updates (records_added, status) VALUES (:records, :status)"),
-                {"records": records_added, "status": status}
-            )
+            update_id = conn.execute(
+                text("""
+                    INSERT INTO data_updates (records_added, records_updated, status, data_changed)
+                    VALUES (:records, :updated, :status, :changed)
+                """),
+                {"records": records_added, "updated": records_updated,
+                 "status": 'refreshing' if changed else status, "changed": int(changed)}
+            ).lastrowid
             conn.commit()
+        
+        if status == 'success':
+            self.pending_version = update_id if changed else None
+            try:
+                for callback in self._update_listeners:
+                    try:
+                        callback(changes or {})
+                    except Exception as e:
+                        print(f"Error in data update listener: {e}")
+                        import traceback
+                        traceback.print_exc()
+            finally:
+                self.pending_version = None
+            
+            if changed:
+                with self.engine.connect() as conn:
+                    conn.execute(text("UPDATE data_updates SET status = 'success' WHERE id = :id"),
+                                 {"id": update_id})
+                    conn.commit()
@@ -0,0 +1,120 @@
+"""Background jobs for long-running data loads"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from .config import JOB_HISTORY_SIZE
+
+# Statuses a job can be in; queued and running jobs are active
+JOB_ACTIVE_STATUSES = ['queued', 'running']
+
+
+class JobManager:
+    """Runs jobs on a single background worker with single-flight de-duplication per kind"""
+    
+    def __init__(self, history_size: int = JOB_HISTORY_SIZE):
+        self.history_size = history_size
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+        # One worker: loads write to the same SQLite file, so they never run in parallel
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bankpulse-job')
+    
+    def submit(self, kind: str, func: Callable[[Callable[..., None]], Dict]) -> Dict:
+        """Start func(progress) in the background, or return the active job of the same kind"""
+        with self._lock:
+            active_id = self._active.get(kind)
+            if active_id is not None:
+                return dict(self._jobs[active_id], deduplicated=True)
+            
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'kind': kind,
+                'status': 'queued',
+                'phase': 'queued',
+                'rows_processed': 0,
+                'rows_total': None,
+                'series_processed': 0,
+                'rows_per_second': 0.0,
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None,
+            }
+            self._active[kind] = job_id
+            self._trim()
+            job = dict(self._jobs[job_id], deduplicated=False)
+        
+        self._executor.submit(self._run, job_id, kind, func)
+        return job
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job's state, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._view(job) if job else None
+    
+    def shutdown(self):
+        """Stop accepting jobs; a running load is left to finish"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _run(self, job_id: str, kind: str, func: Callable):
+        """Execute a job on the worker thread and record its outcome"""
+        self._update(job_id, status='running', started_at=time.time(), phase_started_at=time.time())
+        try:
+            result = func(lambda phase, **counts: self._progress(job_id, phase, **counts))
+            failed = isinstance(result, dict) and result.get('status') == 'error'
+            self._update(job_id, status='failed' if failed else 'succeeded', phase='done',
+                         result=result, error=result.get('message') if failed else None)
+        except Exception as e:
+            print(f"Error in background job {job_id}: {e}")
+            import traceback
+            traceback.print_exc()
+            self._update(job_id, status='failed', phase='done', error=str(e))
+        finally:
+            with self._lock:
+                self._jobs[job_id]['finished_at'] = time.time()
+                if self._active.get(kind) == job_id:
+                    del self._active[kind]
+    
+    def _progress(self, job_id: str, phase: str, rows: Optional[int] = None,
+                  series: Optional[int] = None, total: Optional[int] = None):
+        """Progress callback handed to the job function"""
+        with self._lock:
+            job = self._jobs[job_id]
+            now = time.time()
+            if phase != job['phase']:
+                # Counters and throughput are per phase
+                job.update(phase=phase, phase_started_at=now, rows_processed=0, rows_total=None)
+            if rows is not None:
+                job['rows_processed'] = rows
+            if series is not None:
+                job['series_processed'] = series
+            if total is not None:
+                job['rows_total'] = total
+            elapsed = now - job['phase_started_at']
+            job['rows_per_second'] = round(job['rows_processed'] / elapsed, 1) if elapsed > 0 else 0.0
+    
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+    
+    def _trim(self):
+        """Forget the oldest finished jobs beyond the history size"""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job['status'] not in JOB_ACTIVE_STATUSES]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+    
+    def _view(self, job: Dict) -> Dict:
+        """Public copy of a job with elapsed time filled in"""
+        view = {key: value for key, value in job.items() if key != 'phase_started_at'}
+        if job['started_at']:
+            view['elapsed_seconds'] = round((job['finished_at'] or time.time()) - job['started_at'], 3)
+        return view
@@ -0,0 +1,243 @@
+"""In-process request, query and analytics metrics in Prometheus text format"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+from starlette.routing import Match
+
+# Bucket upper bounds (the +Inf bucket is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Label for requests that matched no route, so unknown paths cannot grow the label set
+UNMATCHED_ROUTE = 'unmatched'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric family with a fixed set of label names"""
+    
+    kind = 'untyped'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labelvalues, value in sorted(self._snapshot().items()):
+            lines.extend(self._samples(labelvalues, value))
+        return lines
+    
+    def _snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self._values)
+    
+    def _samples(self, labelvalues: Tuple, value) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}']
+
+
+class Counter(Metric):
+    """Monotonically increasing total per label set"""
+    
+    kind = 'counter'
+    
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(Metric):
+    """Current value per label set"""
+    
+    kind = 'gauge'
+    
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+    
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+    
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(Metric):
+    """Bucketed observations per label set, with their sum and count"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, *labelvalues):
+        # Per-bucket counts are kept non-cumulative so an observation touches one slot
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+    
+    def _snapshot(self) -> Dict:
+        # Copy the counts under the lock so rendering never sees a half-applied observation
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+    
+    def _samples(self, labelvalues: Tuple, value) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, labelvalues, f'le="{_format_value(bound)}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, labelvalues)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Ordered collection of metric families rendered together"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self) -> str:
+        """Prometheus text exposition of every registered metric"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'bankpulse_http_requests_total', 'HTTP requests by method, route template and status code.',
+    ['method', 'route', 'status']))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'bankpulse_http_request_duration_seconds', 'Time from request start to the last response byte.',
+    ['method', 'route']))
+HTTP_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    'bankpulse_http_response_size_bytes', 'Response body size.', ['method', 'route'], SIZE_BUCKETS))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'bankpulse_http_requests_in_flight', 'HTTP requests currently being served.'))
+QUERY_DURATION = REGISTRY.register(Histogram(
+    'bankpulse_query_duration_seconds', 'Data read time per call, from the database or the in-memory store.',
+    ['source', 'query']))
+QUERY_ROWS = REGISTRY.register(Histogram(
+    'bankpulse_query_rows', 'Rows returned per data read call.', ['source', 'query'], ROW_BUCKETS))
+ANALYTICS_DURATION = REGISTRY.register(Histogram(
+    'bankpulse_analytics_stage_duration_seconds', 'Analytics stage run time.', ['stage']))
+DATA_VERSION = REGISTRY.register(Gauge(
+    'bankpulse_data_version', 'Database data version, bumped by every load that changes data.'))
+
+
+def timed_query(source: str) -> Callable:
+    """Decorator recording the duration and result length of a data read method"""
+    def decorator(func: Callable) -> Callable:
+        labels = (source, func.__name__)
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            QUERY_DURATION.observe(time.perf_counter() - start, *labels)
+            QUERY_ROWS.observe(len(result) if result is not None else 0, *labels)
+            return result
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """Record an analytics stage's run time (usable as a context manager or decorator)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ANALYTICS_DURATION.observe(time.perf_counter() - start, stage)
+
+
+def route_label(scope: Dict) -> str:
+    """Route template of a request (e.g. /data/download/{job_id})"""
+    route = scope.get('route')
+    if route is None:
+        # Answered before routing (cache hits, 304s): match the app's routes directly
+        router = getattr(scope.get('app'), 'router', None)
+        for candidate in getattr(router, 'routes', []):
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, 'path', None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status, response size and in-flight count per route"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        
+        start = time.perf_counter()
+        status = 500
+        size = 0
+        
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+        
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            method, route = scope['method'], route_label(scope)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method, route)
+            HTTP_RESPONSE_SIZE.observe(size, method, route)
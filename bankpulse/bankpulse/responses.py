@@ -0,0 +1,159 @@
+"""Fast JSON responses for BankPulse API endpoints"""
+
+import base64
+import io
+from typing import Any, Dict, List, Iterable, Iterator, Optional, Tuple
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# Optional: Arrow IPC and Parquet output need pyarrow (pip install "bankpulse[arrow]")
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Output formats accepted by the data endpoints' format= parameter
+RESPONSE_FORMATS = ['records', 'columns', 'ndjson', 'arrow', 'parquet']
+FORMAT_PATTERN = f"^({'|'.join(RESPONSE_FORMATS)})$"
+BINARY_FORMATS = ['arrow', 'parquet']
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, which writes NaN and +/-inf as null"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def column_values(series: pd.Series) -> list:
+    """Convert a column to a list of JSON-ready Python values in one vectorized step"""
+    values = series.to_numpy()
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = np.datetime_as_string(values.astype('datetime64[D]'), unit='D')
+    return values.tolist()
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict]:
+    """Convert a DataFrame to records without per-value NaN/inf cleanup"""
+    columns = [str(column) for column in df.columns]
+    values = [column_values(df[column]) for column in df.columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def data_response(**payload: Any) -> FastJSONResponse:
+    """Build a response directly, bypassing FastAPI's per-value jsonable_encoder pass"""
+    return FastJSONResponse(payload)
+
+
+def frame_columns(df: pd.DataFrame) -> Dict[str, list]:
+    """Convert a DataFrame to column-oriented lists keyed by column name"""
+    return {str(column): column_values(df[column]) for column in df.columns}
+
+
+def ndjson_lines(df: pd.DataFrame) -> bytes:
+    """Serialize a DataFrame as newline-delimited JSON records"""
+    return b''.join(orjson.dumps(record, option=ORJSON_OPTIONS) + b'\n' for record in frame_records(df))
+
+
+def ndjson_stream(chunks: Iterable[pd.DataFrame]) -> StreamingResponse:
+    """Stream DataFrame chunks as NDJSON, serializing each chunk as it is produced"""
+    def lines() -> Iterator[bytes]:
+        for chunk in chunks:
+            yield ndjson_lines(chunk)
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def encode_cursor(row: pd.Series) -> str:
+    """Opaque pagination cursor for the last (series_name, series_code, date) returned"""
+    key = [str(row['series_name']), str(row['series_code']), str(row['date'])]
+    return base64.urlsafe_b64encode(orjson.dumps(key)).decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str, str]]:
+    """Decode a pagination cursor, rejecting malformed ones with a 400"""
+    if not cursor:
+        return None
+    try:
+        key = orjson.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if len(key) != 3 or not all(isinstance(part, str) for part in key):
+            raise ValueError("expected three strings")
+        pd.Timestamp(key[2])
+        return tuple(key)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def check_format(format: str):
+    """Reject binary formats up front when pyarrow is not installed"""
+    if format in BINARY_FORMATS and pa is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format={format} requires pyarrow (install bankpulse[arrow])"
+        )
+
+
+def check_dates(*dates: Optional[str]):
+    """Reject malformed start/end dates with a 400 before they reach the query layer"""
+    for date in dates:
+        if not date:
+            continue
+        try:
+            if pd.isna(pd.Timestamp(date)):
+                raise ValueError(date)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail=f"Invalid date: {date} (expected YYYY-MM-DD)")
+
+
+def _arrow_table(df: pd.DataFrame, metadata: Dict) -> "pa.Table":
+    """Build an Arrow table with repeated text columns dictionary-encoded"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if not (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            continue
+        if field.name == 'date':
+            # ISO date strings become a native date32 column
+            column = table.column(i).cast(pa.date32())
+        else:
+            column = table.column(i).dictionary_encode()
+        table = table.set_column(i, field.name, column)
+    # Envelope fields (count, series, ...) travel in the schema metadata
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[b'bankpulse'] = orjson.dumps(metadata, option=ORJSON_OPTIONS)
+    return table.replace_schema_metadata(schema_metadata)
+
+
+def frame_response(df: pd.DataFrame, format: str = 'records', key: str = 'data', **extra: Any):
+    """Render a DataFrame as records JSON, columnar JSON, Arrow IPC stream or Parquet"""
+    metadata = dict(count=len(df), **extra)
+    
+    if format == 'records':
+        return data_response(**{key: frame_records(df)}, **metadata)
+    if format == 'columns':
+        return data_response(**{key: frame_columns(df)}, **metadata)
+    if format == 'ndjson':
+        return Response(content=ndjson_lines(df), media_type=NDJSON_MEDIA_TYPE,
+                        headers={"X-Record-Count": str(len(df))})
+    
+    check_format(format)
+    table = _arrow_table(df, metadata)
+    sink = io.BytesIO()
+    if format == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        media_type = ARROW_MEDIA_TYPE
+    else:
+        pq.write_table(table, sink, compression='zstd')
+        media_type = PARQUET_MEDIA_TYPE
+    
+    return Response(content=sink.getvalue(), media_type=media_type,
+                    headers={"X-Record-Count": str(len(df))})
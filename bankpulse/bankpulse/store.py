@@ -0,0 +1,239 @@
+"""In-memory columnar cache of H8 series for the read path"""
+
+import threading
+from typing import Optional, Dict, List, Union, Tuple
+import numpy as np
+import pandas as pd
+
+from .database import DatabaseManager, DATA_COLUMNS, date_to_int, ints_to_dates
+from .metrics import timed_query
+
+# Composite (series position, date) keys are position * DATE_KEY_SPAN + YYYYMMDD
+DATE_KEY_SPAN = 10 ** 8
+MAX_DATE_INT = DATE_KEY_SPAN - 1
+
+
+class SeriesStore:
+    """Columnar snapshot of all observations mirroring DatabaseManager's read API"""
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        # Readers grab the snapshot reference once; refreshes swap it atomically
+        db_manager.add_update_listener(lambda changes: self.refresh())
+    
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+    
+    def load(self, version: Optional[int] = None):
+        """Load (or reload) the snapshot from the database
+        
+        The snapshot is tagged with the data version it reflects, read before the
+        observations so a load committed meanwhile triggers another reload.
+        """
+        with self._refresh_lock:
+            if version is None:
+                version = self.db_manager.data_version
+            snapshot = self._build_snapshot()
+            snapshot['version'] = version
+            self._snapshot = snapshot
+    
+    def refresh(self):
+        """Rebuild the snapshot after new data has been committed"""
+        # Tagged with the load being published, which is not yet the data version
+        self.load(self.db_manager.pending_version)
+        print(f"Series store refreshed: {len(self._snapshot['values'])} observations")
+    
+    def _build_snapshot(self) -> Dict:
+        """Read the series dimension and observations into contiguous arrays"""
+        with self.db_manager.engine.connect() as conn:
+            series = pd.read_sql(
+                "SELECT id, description AS series_name, code AS series_code, bank_type, asset_class "
+                "FROM series ORDER BY id",
+                conn
+            )
+            obs = pd.read_sql(
+                "SELECT series_id, date_int, value FROM h8_observations ORDER BY series_id, date_int",
+                conn
+            )
+        
+        series_ids = series['id'].to_numpy(dtype=np.int64)
+        keyset_order = series.sort_values(['series_name', 'series_code'], kind='stable').index
+        positions = np.searchsorted(series_ids, obs['series_id'].to_numpy(dtype=np.int64))
+        dates = obs['date_int'].to_numpy(dtype=np.int64)
+        
+        return {
+            # Metadata columns as object arrays so take() yields plain strings
+            'meta': {column: series[column].to_numpy(dtype=object) for column in
+                     ['series_name', 'series_code', 'bank_type', 'asset_class']},
+            'positions': positions,
+            # Series positions in (series_name, series_code) order for keyset pages
+            'keyset_order': keyset_order.to_numpy(dtype=np.int64),
+            'keys': positions * DATE_KEY_SPAN + dates,
+            'date_ints': dates,
+            'dates': ints_to_dates(dates),
+            'values': obs['value'].to_numpy(dtype=np.float64),
+        }
+    
+    def _snapshot_or_load(self) -> Dict:
+        """Current snapshot, reloaded first if another process has published newer data"""
+        version = self.db_manager.data_version
+        snapshot = self._snapshot
+        if snapshot is None or snapshot['version'] < version:
+            with self._refresh_lock:
+                # Concurrent readers that saw the same stale snapshot reload it once
+                if self._snapshot is None or self._snapshot['version'] < version:
+                    snapshot = self._build_snapshot()
+                    snapshot['version'] = version
+                    self._snapshot = snapshot
+            snapshot = self._snapshot
+        return snapshot
+    
+    def _select_series(self, meta: Dict, **filters) -> np.ndarray:
+        """Positions of series matching the metadata filters"""
+        mask = np.ones(len(meta['series_name']), dtype=bool)
+        for column, value in filters.items():
+            if value is None or (isinstance(value, str) and not value):
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            mask &= np.isin(meta[column], values)
+        return np.flatnonzero(mask)
+    
+    def _ranges(self, snapshot: Dict, positions: np.ndarray,
+                start_date: Optional[str], end_date: Optional[str]):
+        """Observation index ranges [lo, hi) for each selected series and date window"""
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else MAX_DATE_INT
+        base = positions.astype(np.int64) * DATE_KEY_SPAN
+        lo = np.searchsorted(snapshot['keys'], base + start, side='left')
+        hi = np.searchsorted(snapshot['keys'], base + end, side='right')
+        return lo, np.maximum(hi, lo)
+    
+    def _expand(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Expand [lo, hi) ranges into one flat index array"""
+        lengths = hi - lo
+        total = int(lengths.sum())
+        offsets = np.repeat(lo - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(total, dtype=np.int64)
+    
+    def _frame(self, snapshot: Dict, index: np.ndarray, columns: List[str]) -> pd.DataFrame:
+        """Gather the requested columns for observation indices"""
+        meta = snapshot['meta']
+        positions = snapshot['positions'][index]
+        data = {}
+        for column in columns:
+            if column == 'date':
+                data[column] = snapshot['dates'][index]
+            elif column == 'value':
+                data[column] = snapshot['values'][index]
+            else:
+                data[column] = meta[column][positions]
+        return pd.DataFrame(data, columns=columns)
+    
+    @timed_query('store')
+    def get_data(self, series_name: Optional[Union[str, List[str]]] = None,
+                 start_date: Optional[str] = None,
+                 end_date: Optional[str] = None,
+                 series_code: Optional[Union[str, List[str]]] = None,
+                 asset_class: Optional[Union[str, List[str]]] = None,
+                 bank_type: Optional[Union[str, List[str]]] = None,
+                 columns: Optional[List[str]] = None,
+                 order_by: Optional[List[str]] = None,
+                 descending: bool = False,
+                 limit: Optional[int] = None) -> pd.DataFrame:
+        """Same contract as DatabaseManager.get_data, served from memory"""
+        columns = columns or DATA_COLUMNS
+        unknown = set(columns).union(order_by or []) - set(DATA_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        
+        snapshot = self._snapshot_or_load()
+        meta = snapshot['meta']
+        selected = self._select_series(meta, series_name=series_name, series_code=series_code,
+                                       asset_class=asset_class, bank_type=bank_type)
+        lo, hi = self._ranges(snapshot, selected, start_date, end_date)
+        
+        index = self._expand(lo, hi)
+        if limit is not None and not order_by:
+            index = index[:int(limit)]
+        
+        needed = columns + [column for column in order_by or [] if column not in columns]
+        df = self._frame(snapshot, index, needed)
+        
+        if order_by:
+            df = df.sort_values(order_by, ascending=not descending, kind='stable')
+            if limit is not None:
+                df = df.head(int(limit))
+            df = df.reset_index(drop=True)
+        
+        return df[columns]
+    
+    @timed_query('store')
+    def get_page(self, limit: Optional[int],
+                 after: Optional[Tuple[str, str, str]] = None,
+                 series_name: Optional[Union[str, List[str]]] = None,
+                 start_date: Optional[str] = None,
+                 end_date: Optional[str] = None,
+                 series_code: Optional[Union[str, List[str]]] = None,
+                 asset_class: Optional[Union[str, List[str]]] = None,
+                 bank_type: Optional[Union[str, List[str]]] = None) -> pd.DataFrame:
+        """Same contract as DatabaseManager.get_page, served from memory"""
+        snapshot = self._snapshot_or_load()
+        meta = snapshot['meta']
+        selected = self._select_series(meta, series_name=series_name, series_code=series_code,
+                                       asset_class=asset_class, bank_type=bank_type)
+        order = snapshot['keyset_order']
+        selected = order[np.isin(order, selected)]
+        
+        lo, hi = self._ranges(snapshot, selected, start_date, end_date)
+        if after:
+            names, codes = meta['series_name'][selected], meta['series_code'][selected]
+            later = (names > after[0]) | ((names == after[0]) & (codes > after[1]))
+            current = (names == after[0]) & (codes == after[1])
+            # The cursor's own series resumes after its date; earlier series are skipped
+            resume = np.searchsorted(snapshot['keys'], selected * DATE_KEY_SPAN + date_to_int(after[2]),
+                                     side='right')
+            lo = np.where(current, np.maximum(lo, resume), lo)
+            keep = later | current
+            selected, lo, hi = selected[keep], lo[keep], np.maximum(hi[keep], lo[keep])
+        
+        if limit is not None:
+            # Trim the ranges to the page before expanding them
+            lengths = hi - lo
+            taken = np.minimum(lengths, np.maximum(int(limit) - (np.cumsum(lengths) - lengths), 0))
+            hi = lo + taken
+        
+        return self._frame(snapshot, self._expand(lo, hi), DATA_COLUMNS)
+    
+    @timed_query('store')
+    def get_series(self, asset_class: Optional[Union[str, List[str]]] = None,
+                   bank_type: Optional[Union[str, List[str]]] = None,
+                   start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> pd.DataFrame:
+        """Same contract as DatabaseManager.get_series, served from memory"""
+        snapshot = self._snapshot_or_load()
+        meta = snapshot['meta']
+        selected = self._select_series(meta, asset_class=asset_class, bank_type=bank_type)
+        lo, hi = self._ranges(snapshot, selected, start_date, end_date)
+        
+        present = hi > lo
+        selected, lo, hi = selected[present], lo[present], hi[present]
+        df = pd.DataFrame({
+            'series_name': meta['series_name'][selected],
+            'series_code': meta['series_code'][selected],
+            'bank_type': meta['bank_type'][selected],
+            'asset_class': meta['asset_class'][selected],
+            'observations': hi - lo,
+            'first_date': snapshot['dates'][lo],
+            'last_date': snapshot['dates'][hi - 1],
+        })
+        return df.sort_values('observations', ascending=False, kind='stable').reset_index(drop=True)
+    
+    def get_latest_date(self) -> Optional[str]:
+        """Get the latest date held in the store"""
+        snapshot = self._snapshot_or_load()
+        if not len(snapshot['date_ints']):
+            return None
+        return str(ints_to_dates([snapshot['date_ints'].max()])[0])
@@ -0,0 +1,154 @@
+"""Synthetic H8 SDMX archives for offline ingest and load testing"""
+
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+from xml.sax.saxutils import escape
+import numpy as np
+
+# Namespaces of the Fed's compact SDMX data files
+NAMESPACES = {
+    'message': 'http://www.SDMX.org/resources/SDMXML/schemas/v1_0/message',
+    'common': 'http://www.SDMX.org/resources/SDMXML/schemas/v1_0/common',
+    'frb': 'http://www.federalreserve.gov/structure/compact/common',
+    'kf': 'http://www.federalreserve.gov/structure/compact/H8_H8',
+}
+STRUCTURE_NAMESPACE = 'http://www.SDMX.org/resources/SDMXML/schemas/v1_0/structure'
+
+# H8 line items (mnemonic stem, description) mapping onto every asset class
+ITEMS = [
+    ('B1020', 'Commercial and industrial loans'),
+    ('B1026', 'Real estate loans'),
+    ('B1029', 'Consumer loans'),
+    ('B1058', 'Deposits'),
+    ('B1048', 'Cash assets: reserves'),
+    ('B1023', 'Loans and leases in bank credit'),
+    ('B1001', 'Bank credit'),
+    ('B1151', 'Securities in bank credit'),
+]
+# Bank groups (mnemonic part, description) mapping onto every bank type
+GROUPS = [
+    ('NCB', 'all commercial banks'),
+    ('NLG', 'large domestically chartered commercial banks'),
+    ('NSM', 'small domestically chartered commercial banks'),
+    ('NFR', 'foreign-related institutions'),
+]
+ADJUSTMENTS = [('A', 'SA', 'seasonally adjusted'), ('N', 'NSA', 'not seasonally adjusted')]
+
+DEFAULT_START_DATE = '1985-01-02'
+# Share of observations published as NA
+MISSING_RATE = 0.002
+
+
+def series_catalog(n_series: int) -> Iterator[Dict[str, str]]:
+    """Code, description and SA code of n_series distinct series cycling through items and groups"""
+    combos = [(item, group, adjustment) for item in ITEMS for group in GROUPS
+              for adjustment in ADJUSTMENTS]
+    for i in range(n_series):
+        (stem, item), (group_code, group), (sa_code, sa, sa_text) = combos[i % len(combos)]
+        panel = i // len(combos)
+        description = f"{item}, {group}, {sa_text}"
+        if panel:
+            description += f", panel {panel}"
+        yield {
+            'code': f"H8/H8/{stem}{group_code}{sa_code}{panel:04d}M",
+            'description': description,
+            'sa': sa,
+        }
+
+
+def _series_xml(series: Dict[str, str], dates: np.ndarray, values: np.ndarray,
+                missing: np.ndarray) -> str:
+    """One kf:Series element with its annotations and observations"""
+    observations = np.where(missing, 'NA', np.char.mod('%.1f', values))
+    obs = '\n'.join(f'<frb:Obs OBS_STATUS="A" OBS_VALUE="{value}" TIME_PERIOD="{date}"/>'
+                    for value, date in zip(observations.tolist(), dates.tolist()))
+    return (
+        f'<kf:Series CURRENCY="USD" FREQ="19" SA="{series["sa"]}" SERIES_NAME="{series["code"]}" '
+        f'UNIT="Currency" UNIT_MULT="1000000">\n'
+        '<frb:Annotations><common:Annotation>'
+        '<common:AnnotationType>Short Description</common:AnnotationType>'
+        f'<common:AnnotationText>{escape(series["description"])}</common:AnnotationText>'
+        '</common:Annotation></frb:Annotations>\n'
+        f'{obs}\n</kf:Series>\n'
+    )
+
+
+def data_xml(n_series: int, weeks: int, seed: int = 0,
+             start_date: str = DEFAULT_START_DATE) -> Iterator[str]:
+    """Stream an H8_data.xml document one series at a time"""
+    rng = np.random.default_rng(seed)
+    dates = np.datetime_as_string(
+        np.datetime64(start_date, 'D') + np.arange(weeks) * np.timedelta64(7, 'D'), unit='D'
+    )
+    declarations = ' '.join(f'xmlns:{prefix}="{uri}"' for prefix, uri in NAMESPACES.items())
+    
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<message:MessageGroup {declarations}>\n'
+    yield '<message:Header><message:ID>H8</message:ID><message:Test>true</message:Test></message:Header>\n'
+    yield '<frb:DataSet id="H8">\n'
+    for series in series_catalog(n_series):
+        # Log-normal starting level, then a random walk with a per-series drift and volatility
+        level = np.exp(rng.uniform(np.log(1e3), np.log(1e6)))
+        drift = rng.normal(0.001, 0.001)
+        volatility = rng.uniform(0.002, 0.02)
+        values = level * np.exp(np.cumsum(rng.normal(drift, volatility, weeks)))
+        missing = rng.random(weeks) < MISSING_RATE
+        yield _series_xml(series, dates, values, missing)
+    yield '</frb:DataSet>\n</message:MessageGroup>\n'
+
+
+def structure_xml() -> str:
+    """H8_struct.xml with codelists for the Series codes the generator emits"""
+    codelists = {
+        'CL_SA': {code: text for _, code, text in ADJUSTMENTS},
+        'CL_FREQ': {'19': 'Weekly, as of Wednesday'},
+        'CL_CURRENCY': {'USD': 'U.S. dollar'},
+    }
+    concepts = {'SA': 'CL_SA', 'FREQ': 'CL_FREQ', 'CURRENCY': 'CL_CURRENCY'}
+    
+    lists = ''.join(
+        f'<structure:CodeList id="{codelist}" agencyID="FRB">'
+        + ''.join(f'<structure:Code value="{code}"><structure:Description>{escape(text)}'
+                  f'</structure:Description></structure:Code>' for code, text in codes.items())
+        + '</structure:CodeList>'
+        for codelist, codes in codelists.items()
+    )
+    dimensions = ''.join(f'<structure:Dimension conceptRef="{concept}" codelist="{codelist}"/>'
+                         for concept, codelist in concepts.items())
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<message:Structure xmlns:message="{NAMESPACES["message"]}" '
+        f'xmlns:structure="{STRUCTURE_NAMESPACE}">'
+        f'<message:CodeLists>{lists}</message:CodeLists>'
+        '<message:KeyFamilies><structure:KeyFamily id="H8_H8" agencyID="FRB">'
+        f'<structure:Components>{dimensions}</structure:Components>'
+        '</structure:KeyFamily></message:KeyFamilies></message:Structure>\n'
+    )
+
+
+def generate_archive(path: Union[str, Path], n_series: int, weeks: int, seed: int = 0,
+                     start_date: str = DEFAULT_START_DATE,
+                     compression: Optional[int] = zipfile.ZIP_DEFLATED) -> Dict:
+    """Write a synthetic H8 archive (.zip) or bare data file (.xml), streaming series by series"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    chunks = data_xml(n_series, weeks, seed, start_date)
+    
+    if path.suffix.lower() == '.xml':
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(chunks)
+    else:
+        with zipfile.ZipFile(path, 'w', compression=compression) as zf:
+            with zf.open('H8_data.xml', 'w', force_zip64=True) as f:
+                for chunk in chunks:
+                    f.write(chunk.encode('utf-8'))
+            zf.writestr('H8_struct.xml', structure_xml())
+    
+    return {
+        'path': str(path),
+        'series': n_series,
+        'weeks': weeks,
+        'observations': n_series * weeks,
+        'bytes': path.stat().st_size,
+    }
@@ -0,0 +1,88 @@
+"""Benchmark /health latency while heavy endpoints are running"""
+
+import argparse
+import itertools
+import threading
+import time
+import numpy as np
+import requests
+
+
+def sample_health(base_url: str, duration: float, interval: float) -> np.ndarray:
+    """Poll /health for a while and return the latencies in milliseconds"""
+    session = requests.Session()
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        session.get(f"{base_url}/health", timeout=30).raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+    return np.array(latencies)
+
+
+def load_worker(base_url: str, method: str, path: str, stop: threading.Event, counts: dict):
+    """Hit a heavy endpoint back to back until stopped"""
+    session = requests.Session()
+    # The response cache keys on the full query string, so a unique parameter per
+    # request keeps GETs from being answered from cache instead of doing the work
+    requests_sent = itertools.count()
+    separator = '&' if '?' in path else '?'
+    while not stop.is_set():
+        url = f"{base_url}{path}"
+        if method == 'GET':
+            url += f"{separator}nocache={threading.get_ident()}-{next(requests_sent)}"
+        try:
+            response = session.request(method, url, timeout=900)
+            counts[response.status_code] = counts.get(response.status_code, 0) + 1
+            if response.status_code == 202:
+                # Download runs as a background job; wait for it before triggering another
+                job_url = f"{base_url}/data/download/{response.json()['job_id']}"
+                while not stop.is_set():
+                    if session.get(job_url, timeout=30).json()['status'] not in ('queued', 'running'):
+                        break
+                    time.sleep(0.5)
+        except requests.RequestException as e:
+            counts[type(e).__name__] = counts.get(type(e).__name__, 0) + 1
+
+
+def report(label: str, latencies: np.ndarray):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{label:<12} n={len(latencies):<5} p50={p50:7.1f}ms  p95={p95:7.1f}ms  "
+          f"p99={p99:7.1f}ms  max={latencies.max():7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure /health latency under analytics and download load')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of a running API server')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per phase')
+    parser.add_argument('--interval', type=float, default=0.02, help='Pause between /health probes')
+    parser.add_argument('--cluster-clients', type=int, default=4, help='Concurrent /analytics/clusters clients')
+    parser.add_argument('--no-download', action='store_true', help='Skip the POST /data/download client')
+    args = parser.parse_args()
+    
+    loads = [('GET', '/analytics/clusters?n_clusters=5')] * args.cluster_clients
+    if not args.no_download:
+        loads.append(('POST', '/data/download'))
+    
+    print(f"Baseline ({args.duration:g}s, idle server)...")
+    baseline = sample_health(args.url, args.duration, args.interval)
+    
+    print(f"Under load ({args.duration:g}s, {len(loads)} heavy clients)...")
+    stop = threading.Event()
+    counts = {}
+    workers = [threading.Thread(target=load_worker, args=(args.url, method, path, stop, counts), daemon=True)
+               for method, path in loads]
+    for worker in workers:
+        worker.start()
+    loaded = sample_health(args.url, args.duration, args.interval)
+    stop.set()
+    
+    print()
+    report('baseline', baseline)
+    report('under load', loaded)
+    print(f"Heavy responses: {counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ import uvicorn
 
 from bankpulse.database import DatabaseManager
 from bankpulse.data_loader import H8DataLoader
+from bankpulse.analytics import CreditAnalytics
 
 
 def main():
@@ -23,7 +24,53 @@ def main():
     subparsers.add_parser('init', help='Initialize the database')
     
     # Download data command
-    subparsers.add_parser('download', help='Download and load H8 data')
+    download_parser = subparsers.add_parser('download', help='Download and load H8 data')
+    download_parser.add_argument('--full', action='store_true',
+                                 help='Reload full history instead of only new or revised observations')
+    download_parser.add_argument('--offline', action='store_true',
+                                 help='Re-ingest the cached archive in DATA_DIR without downloading')
+    download_parser.add_argument('--workers', type=int,
+                                 help='Processes used to parse the archive (default: LOAD_WORKERS)')
+    
+    # Ingest a local archive command
+    ingest_parser = subparsers.add_parser('ingest', help='Load H8 data from a local zip archive or XML file')
+    ingest_parser.add_argument('--from-file', required=True, dest='from_file',
+                               help='Path to an H8 zip archive or H8_data.xml file')
+    ingest_parser.add_argument('--full', action='store_true',
+                               help='Reload full history instead of only new or revised observations')
+    ingest_parser.add_argument('--workers', type=int,
+                               help='Processes used to parse the archive (default: LOAD_WORKERS)')
+    
+    # Synthetic archive command
+    synth_parser = subparsers.add_parser('synth', help='Generate a synthetic H8 archive for load testing')
+    synth_parser.add_argument('output', help='Output path (.zip archive or bare .xml data file)')
+    synth_parser.add_argument('--series', type=int, default=500, help='Number of series')
+    synth_parser.add_argument('--weeks', type=int, default=2087, help='Weekly observations per series')
+    synth_parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    
+    # Benchmark suite command
+    bench_parser = subparsers.add_parser('bench', help='Benchmark ingest, queries, analytics and API on synthetic data')
+    # Unset options fall back to the suite's own defaults, so the parser needs no benchmark import
+    bench_parser.add_argument('--scales', nargs='+',
+                              help='Data scales as SERIESxWEEKS (default: 100x520 500x1040 2000x2087)')
+    bench_parser.add_argument('--repeat', type=int, help='Runs per stage (default: 3)')
+    bench_parser.add_argument('--requests', type=int, help='Requests per API endpoint (default: 20)')
+    bench_parser.add_argument('--workers', type=int, default=1, help='Also time parallel parsing with this many workers')
+    bench_parser.add_argument('--no-memory', action='store_true', help='Skip peak memory tracing')
+    bench_parser.add_argument('--output', help='Write JSON results to this file')
+    bench_parser.add_argument('--compare', help='Baseline JSON results to check for regressions')
+    bench_parser.add_argument('--threshold', type=float,
+                              help='Median slowdown (fraction) reported as a regression (default: 0.2)')
+    bench_parser.add_argument('--workdir', help='Keep generated archives and databases here')
+    
+    # Rebuild derived analytics command
+    subparsers.add_parser('rebuild', help='Recompute growth rates and anomaly scores from stored data')
+    
+    # Reclassify series command
+    reclassify_parser = subparsers.add_parser(
+        'reclassify', help='Re-run series classification rules over stored series'
+    )
+    reclassify_parser.add_argument('--structure', help='H8_struct.xml to use for codelist label rules')
     
     # Status command
     subparsers.add_parser('status', help='Show database status')
@@ -49,24 +96,75 @@ def main():
         print("Downloading H8 data...")
         db_manager = DatabaseManager()
         db_manager.init_database()
+        # Registers ingest-time maintenance of derived analytics tables
+        CreditAnalytics(db_manager)
+        loader = H8DataLoader(db_manager)
+        result = loader.load_and_update(incremental=not args.full, workers=args.workers,
+                                        offline=args.offline)
+        print(f"Status: {result['status']}")
+        print(f"Message: {result['message']}")
+    
+    elif args.command == 'ingest':
+        print(f"Ingesting H8 data from {args.from_file}...")
+        db_manager = DatabaseManager()
+        db_manager.init_database()
+        CreditAnalytics(db_manager)
         loader = H8DataLoader(db_manager)
-        result = loader.load_and_update()
+        result = loader.load_and_update(incremental=not args.full, workers=args.workers,
+                                        source=args.from_file)
         print(f"Status: {result['status']}")
         print(f"Message: {result['message']}")
     
+    elif args.command == 'synth':
+        from bankpulse.synthetic import generate_archive
+        print(f"Generating {args.series} series x {args.weeks} weeks...")
+        result = generate_archive(args.output, args.series, args.weeks, seed=args.seed)
+        print(f"Wrote {result['observations']} observations to {result['path']} "
+              f"({result['bytes'] / 1e6:.1f} MB)")
+    
+    elif args.command == 'bench':
+        from bankpulse.benchmark import run_suite
+        defaulted = {'repeat': args.repeat, 'requests': args.requests, 'threshold': args.threshold}
+        results = run_suite(args.scales, workers=args.workers, memory=not args.no_memory,
+                            output=args.output, baseline=args.compare, workdir=args.workdir,
+                            **{k: v for k, v in defaulted.items() if v is not None})
+        if results.get('regressions'):
+            sys.exit(1)
+    
+    elif args.command == 'rebuild':
+        print("Rebuilding derived analytics tables...")
+        db_manager = DatabaseManager()
+        db_manager.init_database()
+        CreditAnalytics(db_manager).rebuild_derived()
+        print("Derived analytics rebuilt successfully!")
+    
+    elif args.command == 'reclassify':
+        print("Reclassifying series...")
+        db_manager = DatabaseManager()
+        db_manager.init_database()
+        loader = H8DataLoader(db_manager)
+        if args.structure:
+            loader.classifier.load_structure(args.structure)
+        result = loader.reclassify()
+        print(f"Reclassified {result['series']} series, {result['changed']} changed")
+        if result['changed']:
+            # FLLI components are keyed on asset class
+            print("Rebuilding derived analytics tables...")
+            CreditAnalytics(db_manager).rebuild_derived()
+    
     elif args.command == 'status':
         db_manager = DatabaseManager()
-        latest_date = db_manager.get_latest_date()
-        data = db_manager.get_data()
+        db_manager.init_database()
+        summary = db_manager.get_summary()
         
         print("\n=== BankPulse Database Status ===")
-        print(f"Latest data date: {latest_date or 'No data'}")
-        print(f"Total records: {len(data)}")
+        print(f"Latest data date: {summary['date_range']['max'] or 'No data'}")
+        print(f"Total records: {summary['total_records']}")
         
-        if not data.empty:
-            print(f"Date range: {data['date'].min()} to {data['date'].max()}")
-            print(f"Unique series: {data['series_name'].nunique()}")
-            print(f"Asset classes: {', '.join(data['asset_class'].unique())}")
+        if summary['total_records']:
+            print(f"Date range: {summary['date_range']['min']} to {summary['date_range']['max']}")
+            print(f"Unique series: {summary['series_count']}")
+            print(f"Asset classes: {', '.join(summary['asset_classes'])}")
     
     else:
         parser.print_help()
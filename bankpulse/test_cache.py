@@ -0,0 +1,122 @@
+"""Response cache, ETags and the data version they are keyed on"""
+
+import pandas as pd
+import pytest
+
+from bankpulse.database import DatabaseManager
+from bankpulse.analytics import CreditAnalytics
+from bankpulse.cache import ResponseCache, etag_matches, make_etag, normalize_query
+
+
+def frame(dates, value: float = 1.0) -> pd.DataFrame:
+    """One weekly series over the given dates"""
+    return pd.DataFrame({
+        'series_name': 'Loans, all commercial banks',
+        'date': dates,
+        'value': value,
+        'bank_type': 'all_commercial',
+        'asset_class': 'commercial_industrial',
+        'series_code': 'H8/LOANS',
+    })
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'cache.db'))
+    db.init_database()
+    return db
+
+
+def test_data_version_follows_other_processes(db):
+    """A load committed through another manager (CLI, other worker) bumps the version"""
+    other = DatabaseManager(db.db_path)
+    assert db.data_version == 0
+
+    other.insert_data(frame(['2024-01-03']))
+    other.record_update(1, 'success', changes={'H8/LOANS': '2024-01-03'})
+    assert db.data_version == other.data_version > 0
+
+
+def test_data_version_published_after_listeners(db):
+    """Listeners run before the load becomes the data version; no-op loads keep it"""
+    seen = []
+    db.add_update_listener(lambda changes: seen.append((db.data_version, db.pending_version)))
+    db.record_update(1, 'success', changes={'H8/LOANS': '2024-01-03'})
+    version = db.data_version
+    assert seen == [(0, version)]
+
+    db.record_update(0, 'success', changes={})
+    db.record_update(0, 'error: offline')
+    assert db.data_version == version
+
+
+def test_rebuild_publishes_new_version(db):
+    """Rebuilding derived tables (rebuild, reclassify) invalidates cached responses"""
+    analytics = CreditAnalytics(db)
+    db.insert_data(frame(pd.date_range('2024-01-03', periods=10, freq='7D').strftime('%Y-%m-%d')))
+    db.record_update(10, 'success', changes={'H8/LOANS': '2024-01-03'})
+    version = db.data_version
+
+    analytics.rebuild_derived()
+    assert db.data_version > version
+
+
+def test_query_normalization():
+    """Parameter order and empty values do not split cache entries"""
+    cache = ResponseCache()
+    assert cache.key('/analytics/flli', 'end_date=2024-01-01&start_date=', 3) == \
+        cache.key('/analytics/flli', 'end_date=2024-01-01', 3)
+    assert normalize_query('b=2&a=1&c=') == 'a=1&b=2'
+
+
+def test_cache_hits_and_version_purge():
+    """Entries are served until a newer data version is seen, then dropped"""
+    cache = ResponseCache()
+    key = cache.key('/data/summary', '', 1)
+    assert cache.get(key) is None
+    entry = cache.put(key, b'{"total_records":1}', {'content-type': 'application/json'})
+    assert cache.get(key) == entry
+
+    newer = cache.key('/data/summary', '', 2)
+    assert cache.get(newer) is None
+    assert cache.get(key) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['data_version']) == (1, 3, 0, 2)
+
+
+def test_results_for_replaced_data_are_not_stored():
+    """A response computed under an older version is returned but never cached"""
+    cache = ResponseCache()
+    cache.get(cache.key('/analytics/flli', '', 5))
+    stale = cache.key('/analytics/flli', '', 4)
+    assert cache.put(stale, b'{}', {})['etag'] == make_etag(4, b'{}')
+    assert cache.stats()['stores'] == 0
+
+
+def test_lru_bounds_entries_and_bytes():
+    """The least recently used entries go first when either bound is exceeded"""
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    keys = [cache.key('/analytics/anomalies', f'threshold={i}', 1) for i in range(3)]
+    cache.put(keys[0], b'aaaa', {})
+    cache.put(keys[1], b'bbbb', {})
+    cache.get(keys[0])
+    cache.put(keys[2], b'cccc', {})
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+
+    cache.put(keys[1], b'b' * 8, {})
+    assert cache.stats()['bytes'] <= 10
+    # Bodies larger than the byte bound are returned but never stored
+    oversized = cache.key('/analytics/anomalies', 'threshold=9', 1)
+    cache.put(oversized, b'x' * 11, {})
+    assert cache.get(oversized) is None
+
+
+def test_etags_and_if_none_match():
+    """ETags change with the version and body; If-None-Match handles lists, weak tags and *"""
+    etag = make_etag(7, b'body')
+    assert etag != make_etag(8, b'body') and etag != make_etag(7, b'other')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(make_etag(6, b'body'), etag)
@@ -0,0 +1,78 @@
+"""Bulk upsert counts and SQL aggregates of DatabaseManager"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bankpulse.database import DatabaseManager, ints_to_dates
+
+
+def frame(codes, dates, values) -> pd.DataFrame:
+    """Rows for every (code, date) pair, with values in the same order"""
+    index = pd.MultiIndex.from_product([codes, dates], names=['series_code', 'date'])
+    df = index.to_frame(index=False)
+    return df.assign(series_name=df['series_code'] + ' description', value=values,
+                     bank_type='all_commercial', asset_class='commercial_industrial')
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'database.db'))
+    db.init_database()
+    return db
+
+
+CODES = ['H8/A', 'H8/B', 'H8/C']
+DATES = pd.date_range('2024-01-03', periods=20, freq='7D').strftime('%Y-%m-%d').tolist()
+
+
+def test_upsert_counts_inserted_and_updated(db):
+    """Counts come from the statements themselves, across several batches"""
+    values = np.arange(len(CODES) * len(DATES), dtype=float)
+    df = frame(CODES, DATES, values)
+    assert db.upsert_data(df, batch_size=7) == {'inserted': 60, 'updated': 0}
+
+    # Reloading identical rows writes nothing
+    assert db.upsert_data(df, batch_size=7) == {'inserted': 0, 'updated': 0}
+
+    # Five revised values plus a new week for every series
+    revised = values.copy()
+    revised[[0, 9, 21, 40, 59]] += 0.5
+    extra = DATES + ['2024-05-22']
+    df = frame(CODES, extra, np.concatenate([np.append(revised[i * 20:(i + 1) * 20], -1.0)
+                                             for i in range(len(CODES))]))
+    assert db.upsert_data(df, batch_size=7) == {'inserted': 3, 'updated': 5}
+    stored = db.get_data(series_code='H8/B', columns=['date', 'value'])
+    assert stored['value'].tolist()[:2] == [20.0, 21.5]
+
+
+def scanned_totals(db: DatabaseManager) -> tuple:
+    """Row count and date range from a full scan of the observations"""
+    with db.engine.connect() as conn:
+        total, first, last = conn.exec_driver_sql(
+            "SELECT COUNT(*), MIN(date_int), MAX(date_int) FROM h8_observations"
+        ).fetchone()
+    return (total, *ints_to_dates([first, last]).tolist())
+
+
+def test_summary_totals_follow_upserts(db):
+    """The kept row count and date range match a scan after inserts and revisions"""
+    assert db.get_summary()['total_records'] == 0
+    db.upsert_data(frame(CODES, DATES[5:], 1.0))
+    db.upsert_data(frame(CODES[:1], DATES, 2.0))
+    
+    summary = db.get_summary()
+    assert (summary['total_records'], summary['date_range']['min'],
+            summary['date_range']['max']) == scanned_totals(db) == (50, DATES[0], DATES[-1])
+    assert summary['series_count'] == len(CODES)
+
+
+def test_summary_totals_seeded_for_existing_database(db):
+    """Databases loaded before the totals table existed are counted on init"""
+    db.upsert_data(frame(CODES, DATES, 1.0))
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("DROP TABLE observation_totals")
+        conn.commit()
+    
+    db.init_database()
+    assert db.get_summary()['total_records'] == len(CODES) * len(DATES)
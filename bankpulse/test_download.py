@@ -0,0 +1,154 @@
+"""Conditional-GET and resumable H8 downloads against a local HTTP stand-in"""
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from bankpulse.database import DatabaseManager
+from bankpulse.data_loader import H8DataLoader, ARCHIVE_NAME
+from bankpulse.synthetic import generate_archive
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    """Serves server.payload with an ETag, honouring If-None-Match and Range/If-Range"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body = server.payload
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        start = 0
+        ranged = self.headers.get('Range')
+        if ranged and not server.ignore_range and self.headers.get('If-Range') == server.etag:
+            start = int(ranged[len('bytes='):].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+        else:
+            self.send_response(200)
+        self.send_header('ETag', server.etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        self.end_headers()
+
+        if server.truncate is not None:
+            # Drop the connection part way through the body
+            self.wfile.write(body[start:start + server.truncate])
+            server.truncate = None
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = generate_archive(tmp_path / 'release.zip', 3, 20)['path']
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ReleaseHandler)
+    with open(path, 'rb') as f:
+        server.payload = f.read()
+    server.etag = '"release-1"'
+    server.ignore_range = False
+    server.truncate = None
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def make_loader(tmp_path, url: str, db_manager=None) -> H8DataLoader:
+    """Loader downloading url into its own data directory"""
+    loader = H8DataLoader(db_manager, data_url=url)
+    loader.data_dir = tmp_path / 'data'
+    loader.data_dir.mkdir(exist_ok=True)
+    loader.archive_path = loader.data_dir / ARCHIVE_NAME
+    return loader
+
+
+@pytest.fixture
+def loader(tmp_path, server, monkeypatch):
+    # Small chunks, so a dropped connection leaves a partial file to resume from
+    monkeypatch.setattr('bankpulse.data_loader.DOWNLOAD_CHUNK_SIZE', 256)
+    return make_loader(tmp_path, f'http://127.0.0.1:{server.server_address[1]}/H8.zip')
+
+
+def part_path(loader: H8DataLoader):
+    """Partial download file next to the loader's archive"""
+    return loader.archive_path.with_name(ARCHIVE_NAME + '.part')
+
+
+def test_full_download(loader, server):
+    """A first download fetches the whole release and records its validators"""
+    result = loader.download_data()
+
+    assert result['modified']
+    assert loader.archive_path.read_bytes() == server.payload
+    assert not part_path(loader).exists()
+    assert loader._archive_metadata()['etag'] == server.etag
+
+
+def test_not_modified_is_no_new_release(tmp_path, server):
+    """A 304 for an ingested archive ends the load without parsing"""
+    db = DatabaseManager(str(tmp_path / 'download.db'))
+    db.init_database()
+    loader = make_loader(tmp_path, f'http://127.0.0.1:{server.server_address[1]}/H8.zip', db)
+    assert loader.load_and_update()['records_added'] > 0
+
+    result = loader.load_and_update()
+    assert server.requests[-1]['If-None-Match'] == server.etag
+    assert result['status'] == 'success'
+    assert result['message'] == 'No new H8 release since the last load'
+
+
+def test_resume_from_partial_file(loader, server):
+    """An interrupted download continues from the partial file with a Range request"""
+    server.truncate = len(server.payload) // 2
+    with pytest.raises(requests.RequestException):
+        loader.download_data()
+    written = part_path(loader).stat().st_size
+    assert written > 0
+    assert not loader.archive_path.exists()
+
+    assert loader.download_data()['modified']
+    assert server.requests[-1]['Range'] == f'bytes={written}-'
+    assert loader.archive_path.read_bytes() == server.payload
+
+
+def test_server_ignoring_range_restarts(loader, server):
+    """A 200 answer to a Range request rewrites the partial file from the start"""
+    server.truncate = len(server.payload) // 2
+    with pytest.raises(requests.RequestException):
+        loader.download_data()
+
+    server.ignore_range = True
+    assert loader.download_data()['modified']
+    assert 'Range' in server.requests[-1]
+    assert loader.archive_path.read_bytes() == server.payload
+
+
+def test_failed_download_keeps_previous_archive(loader, server, tmp_path):
+    """Dropped and refused connections never replace the cached archive"""
+    loader.download_data()
+    server.payload = server.payload[::-1]
+    server.etag = '"release-2"'
+    server.truncate = 100
+    with pytest.raises(requests.RequestException):
+        loader.download_data()
+
+    # A refused connection fails before anything is written
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    refused = make_loader(tmp_path, f'http://127.0.0.1:{port}/H8.zip')
+    with pytest.raises(requests.ConnectionError):
+        refused.download_data()
+
+    server.payload = server.payload[::-1]
+    assert loader.archive_path.read_bytes() == server.payload
@@ -0,0 +1,99 @@
+"""Background load jobs with single-flight de-duplication"""
+
+import threading
+import time
+
+import pytest
+
+from bankpulse.jobs import JobManager
+
+
+def wait(jobs: JobManager, job_id: str, timeout: float = 5.0) -> dict:
+    """Poll a job until it finishes"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+
+@pytest.fixture
+def jobs():
+    jobs = JobManager(history_size=3)
+    yield jobs
+    jobs.shutdown()
+
+
+def blocking_job(release: threading.Event, result: dict = None):
+    """Job function that reports progress, then waits until released"""
+    def run(progress):
+        progress('writing', rows=5, total=10)
+        release.wait(5)
+        return result or {'status': 'success', 'records_added': 10}
+    return run
+
+
+def test_active_job_of_same_kind_is_joined(jobs):
+    release = threading.Event()
+    first = jobs.submit('download', blocking_job(release))
+    second = jobs.submit('download', blocking_job(release))
+
+    assert not first['deduplicated']
+    assert second['deduplicated'] and second['job_id'] == first['job_id']
+    release.set()
+    assert wait(jobs, first['job_id'])['status'] == 'succeeded'
+
+    # Once finished, a new submission starts a new job
+    third = jobs.submit('download', blocking_job(release))
+    assert not third['deduplicated'] and third['job_id'] != first['job_id']
+    wait(jobs, third['job_id'])
+
+
+def test_other_kinds_queue_behind_the_running_job(jobs):
+    release = threading.Event()
+    first = jobs.submit('download', blocking_job(release))
+    other = jobs.submit('download_full', blocking_job(release))
+    assert not other['deduplicated'] and other['job_id'] != first['job_id']
+
+    # One worker: the second job waits for the first
+    assert jobs.get(other['job_id'])['status'] == 'queued'
+    release.set()
+    assert wait(jobs, other['job_id'])['status'] == 'succeeded'
+
+
+def test_progress_and_outcome_are_reported(jobs):
+    release = threading.Event()
+    job_id = jobs.submit('download', blocking_job(release))['job_id']
+    deadline = time.time() + 5
+    while jobs.get(job_id)['phase'] != 'writing' and time.time() < deadline:
+        time.sleep(0.01)
+    job = jobs.get(job_id)
+    assert (job['status'], job['rows_processed'], job['rows_total']) == ('running', 5, 10)
+
+    release.set()
+    job = wait(jobs, job_id)
+    assert (job['phase'], job['result']['records_added']) == ('done', 10)
+    assert job['elapsed_seconds'] >= 0
+    assert jobs.get('unknown') is None
+
+
+def test_errors_mark_the_job_failed(jobs):
+    def explode(progress):
+        raise RuntimeError('archive unreadable')
+
+    failed = wait(jobs, jobs.submit('download', explode)['job_id'])
+    assert (failed['status'], failed['error']) == ('failed', 'archive unreadable')
+
+    release = threading.Event()
+    release.set()
+    job = jobs.submit('download', blocking_job(release, {'status': 'error', 'message': 'No data'}))
+    assert wait(jobs, job['job_id'])['error'] == 'No data'
+
+
+def test_history_keeps_most_recent_finished_jobs(jobs):
+    done = threading.Event()
+    done.set()
+    ids = [wait(jobs, jobs.submit('download', blocking_job(done))['job_id'])['job_id'] for _ in range(5)]
+    assert [jobs.get(job_id) is not None for job_id in ids] == [False, False, True, True, True]
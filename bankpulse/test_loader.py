@@ -0,0 +1,65 @@
+"""Incremental H8 ingest from local archives"""
+
+import re
+
+import pytest
+
+from bankpulse.database import DatabaseManager
+from bankpulse.data_loader import H8DataLoader
+from bankpulse.synthetic import generate_archive
+
+SERIES = 6
+WEEKS = 30
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return generate_archive(tmp_path / 'H8_data.xml', SERIES, WEEKS)['path']
+
+
+@pytest.fixture
+def loader(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'loader.db'))
+    db.init_database()
+    return H8DataLoader(db)
+
+
+def revise(path: str, count: int) -> str:
+    """Rewrite the first count published observations of the archive"""
+    with open(path, encoding='utf-8') as f:
+        xml = f.read()
+    xml = re.sub(r'OBS_VALUE="[\d.]+"', 'OBS_VALUE="1.5"', xml, count=count)
+    revised = path.replace('.xml', '_revised.xml')
+    with open(revised, 'w', encoding='utf-8') as f:
+        f.write(xml)
+    return revised
+
+
+def count_calls(monkeypatch, obj, name: str) -> list:
+    """Record the arguments of every call to obj.name"""
+    calls = []
+    method = getattr(obj, name)
+    monkeypatch.setattr(obj, name, lambda *args, **kwargs: calls.append(kwargs) or method(*args, **kwargs))
+    return calls
+
+
+def test_first_load_reads_stored_rows_once(loader, archive, monkeypatch):
+    """Series without a high-water mark are diffed against the database in one query"""
+    calls = count_calls(monkeypatch, loader.db_manager, 'get_data')
+    result = loader.load_and_update(source=archive)
+
+    assert result['status'] == 'success'
+    assert result['records_added'] > SERIES * WEEKS * 0.9
+    assert len(calls) == 1
+    assert len(calls[0]['series_code']) == SERIES
+
+
+def test_revised_history_writes_only_changed_rows(loader, archive, monkeypatch):
+    """A revised release rewrites the revised observations and nothing else"""
+    loader.load_and_update(source=archive)
+    calls = count_calls(monkeypatch, loader.db_manager, 'get_data')
+    result = loader.load_and_update(source=revise(archive, 3))
+
+    assert (result['records_added'], result['records_updated']) == (0, 3)
+    assert result['series_updated'] == 1
+    assert len(calls) == 1
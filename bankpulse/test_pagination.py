@@ -0,0 +1,94 @@
+"""Keyset pagination cursors and NDJSON streaming for /data/series"""
+
+import asyncio
+
+import orjson
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from bankpulse.database import DatabaseManager, KEYSET_COLUMNS
+from bankpulse.store import SeriesStore
+from bankpulse.responses import encode_cursor, decode_cursor, ndjson_stream
+
+DATES = pd.date_range('2024-01-03', periods=7, freq='7D').strftime('%Y-%m-%d').tolist()
+
+
+def frame() -> pd.DataFrame:
+    """Four series, two of them sharing a description so only the code tells them apart"""
+    series = [('H8/B', 'Deposits'), ('H8/A', 'Deposits'), ('H8/C', 'Bank credit'), ('H8/D', 'Loans')]
+    return pd.DataFrame([
+        {'series_name': name, 'date': date, 'value': float(i * 10 + j), 'bank_type': 'all',
+         'asset_class': 'deposits' if name == 'Deposits' else 'other', 'series_code': code}
+        for i, (code, name) in enumerate(series) for j, date in enumerate(DATES)
+    ])
+
+
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+    db = DatabaseManager(str(tmp_path_factory.mktemp('pagination') / 'pagination.db'))
+    db.init_database()
+    db.insert_data(frame())
+    return db
+
+
+@pytest.fixture(scope='module', params=['database', 'store'])
+def source(request, db):
+    """Pages are served from the store; the database path must agree with it"""
+    if request.param == 'database':
+        return db
+    store = SeriesStore(db)
+    store.load()
+    return store
+
+
+def walk(source, limit: int, **filters) -> list:
+    """Every page in turn, following cursors through their encoded form"""
+    pages, cursor = [], None
+    while True:
+        page = source.get_page(limit, decode_cursor(cursor), **filters)
+        pages.append(page)
+        if len(page) < limit:
+            return pages
+        cursor = encode_cursor(page.iloc[-1])
+
+
+@pytest.mark.parametrize('limit', [1, 5, 7, 9, 100])
+def test_pages_cover_rows_once_in_keyset_order(source, limit):
+    """Full pages until the last, every row exactly once, ties on name broken by code"""
+    pages = walk(source, limit)
+    rows = pd.concat([page for page in pages if len(page)], ignore_index=True)
+    expected = frame().sort_values(KEYSET_COLUMNS, ignore_index=True)[rows.columns]
+
+    assert all(len(page) == limit for page in pages[:-1])
+    pd.testing.assert_frame_equal(rows, expected)
+
+
+def test_pages_apply_filters(source):
+    """Cursors keep working when the pages are filtered"""
+    rows = pd.concat(walk(source, 3, series_name='Deposits', start_date=DATES[2]), ignore_index=True)
+    assert rows['series_code'].tolist() == ['H8/A'] * 5 + ['H8/B'] * 5
+    assert rows['date'].min() == DATES[2]
+
+
+def test_malformed_cursor_is_rejected():
+    """Undecodable cursors and cursors with a bad date are a 400"""
+    for cursor in ['not base64!', encode_cursor(pd.Series({'series_name': 'x', 'series_code': 'y',
+                                                           'date': 'yesterday'}))]:
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor)
+        assert error.value.status_code == 400
+
+
+def test_ndjson_stream_matches_pages(db):
+    """Streamed chunks serialize to one JSON record per line, in keyset order"""
+    async def body(response) -> bytes:
+        return b''.join([chunk async for chunk in response.body_iterator])
+
+    response = ndjson_stream(db.iter_data(after=('Deposits', 'H8/A', DATES[-1]), chunk_size=4))
+    lines = asyncio.run(body(response)).splitlines()
+    records = [orjson.loads(line) for line in lines]
+
+    assert response.media_type == 'application/x-ndjson'
+    assert records == db.get_page(None, ('Deposits', 'H8/A', DATES[-1])).to_dict('records')
+    assert records[0]['series_code'] == 'H8/B'
@@ -0,0 +1,116 @@
+"""Streaming H8 XML parsing, sequential and on a process pool"""
+
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bankpulse.data_loader import H8DataLoader, open_member, _read_series_range
+from bankpulse.synthetic import generate_archive
+
+H8_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<message:MessageGroup xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v1_0/message"
+    xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v1_0/common"
+    xmlns:frb="http://www.federalreserve.gov/structure/compact/common"
+    xmlns:kf="http://www.federalreserve.gov/structure/compact/H8_H8">
+<frb:DataSet id="H8">
+<kf:Series FREQ="19" SA="SA" SERIES_NAME="H8/H8/B1020NCBAM">
+<frb:Annotations><common:Annotation>
+<common:AnnotationType>Short Description</common:AnnotationType>
+<common:AnnotationText>Commercial and industrial loans, all commercial banks</common:AnnotationText>
+</common:Annotation></frb:Annotations>
+<frb:Obs OBS_STATUS="A" OBS_VALUE="2750.5" TIME_PERIOD="2024-01-03"/>
+<frb:Obs OBS_STATUS="ND" OBS_VALUE="NA" TIME_PERIOD="2024-01-10"/>
+<frb:Obs OBS_STATUS="A" OBS_VALUE="2761.25" TIME_PERIOD="2024-01-17"/>
+</kf:Series>
+<kf:Series FREQ="129" SA="NSA" SERIES_NAME="H8/H8/B1058NSMXM">
+<frb:Annotations><common:Annotation>
+<common:AnnotationType>Short Description</common:AnnotationType>
+<common:AnnotationText>Deposits, small domestically chartered commercial banks</common:AnnotationText>
+</common:Annotation></frb:Annotations>
+<frb:Obs OBS_STATUS="A" OBS_VALUE="5100" TIME_PERIOD="2023-12"/>
+<frb:Obs OBS_STATUS="A" OBS_VALUE="5120" TIME_PERIOD="2024-01"/>
+</kf:Series>
+<kf:Series FREQ="19" SA="SA" SERIES_NAME="H8/H8/EMPTY">
+<frb:Obs OBS_STATUS="ND" OBS_VALUE="NA" TIME_PERIOD="2024-01-03"/>
+</kf:Series>
+</frb:DataSet>
+</message:MessageGroup>
+"""
+
+
+@pytest.fixture
+def loader():
+    return H8DataLoader(None)
+
+
+def test_iter_series_yields_column_arrays(loader):
+    """Each Series becomes typed arrays with NA and unparseable rows dropped"""
+    series = list(loader.iter_series(io.BytesIO(H8_XML)))
+    assert [s['series_code'] for s in series] == ['H8/H8/B1020NCBAM', 'H8/H8/B1058NSMXM', 'H8/H8/EMPTY']
+
+    loans = series[0]
+    assert loans['series_name'] == 'Commercial and industrial loans, all commercial banks'
+    assert (loans['bank_type'], loans['asset_class']) == ('all', 'commercial_industrial')
+    assert loans['attributes'] == {'FREQ': '19', 'SA': 'SA'}
+    assert loans['dates'].dtype == np.dtype('datetime64[D]')
+    assert np.datetime_as_string(loans['dates']).tolist() == ['2024-01-03', '2024-01-17']
+    assert loans['values'].tolist() == [2750.5, 2761.25]
+
+    # Monthly periods are normalized to the first of the month
+    deposits = series[1]
+    assert np.datetime_as_string(deposits['dates']).tolist() == ['2023-12-01', '2024-01-01']
+    assert (deposits['bank_type'], deposits['asset_class']) == ('small', 'deposits')
+    assert len(series[2]['values']) == 0
+
+
+def test_parse_xml_data_builds_long_frame(loader):
+    """The long-format frame keeps only observed values, in document order"""
+    df = loader.parse_xml_data(H8_XML)
+    assert df.columns.tolist() == ['series_name', 'date', 'value', 'bank_type', 'asset_class',
+                                   'series_code']
+    assert df['series_code'].tolist() == ['H8/H8/B1020NCBAM'] * 2 + ['H8/H8/B1058NSMXM'] * 2
+    assert df['date'].tolist() == ['2024-01-03', '2024-01-17', '2023-12-01', '2024-01-01']
+    assert df['value'].tolist() == [2750.5, 2761.25, 5100.0, 5120.0]
+
+
+@pytest.fixture(scope='module')
+def archive(tmp_path_factory):
+    return generate_archive(tmp_path_factory.mktemp('parser') / 'H8.zip', 40, 60)['path']
+
+
+def series_frame(loader: H8DataLoader, parsed) -> pd.DataFrame:
+    """Long-format frame of parsed series"""
+    return loader._series_to_frame(list(parsed))
+
+
+def test_byte_ranges_cover_every_series_once(loader, archive):
+    """Splitting a member at arbitrary offsets hands each Series to exactly one range"""
+    member, size = next(iter(loader._archive_members(Path(archive))['data'].items()))
+    with open_member(archive, member) as f:
+        tag, _ = loader._member_layout(f)
+        bounds = [0, 1, size // 3, size // 3 + 7, size // 2, size - 10] + [None]
+        chunks = [_read_series_range(f, lo, hi, tag) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        f.seek(0)
+        document = f.read()
+
+    body = b''.join(chunks)
+    assert body.count(b'<kf:Series ') == 40
+    start = document.index(b'<kf:Series ')
+    end = document.rindex(b'</kf:Series>') + len(b'</kf:Series>')
+    assert body == document[start:end]
+
+
+def test_parallel_parse_matches_sequential(loader, archive, monkeypatch):
+    """A process pool over byte ranges yields the same series, in the same order"""
+    # Small enough that the member is split across every worker
+    monkeypatch.setattr('bankpulse.data_loader.PARSE_SPLIT_MIN_BYTES', 1024)
+    path = Path(archive)
+    members = loader._archive_members(path)['data']
+    sequential = series_frame(loader, loader._parse_sequential(path, members))
+    parallel = series_frame(loader, loader._parse_parallel(path, members, 3))
+
+    assert len(sequential) > 40 * 50
+    pd.testing.assert_frame_equal(parallel, sequential)
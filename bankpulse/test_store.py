@@ -0,0 +1,53 @@
+"""SeriesStore snapshots follow loads from this and other processes"""
+
+import pandas as pd
+import pytest
+
+from bankpulse.database import DatabaseManager
+from bankpulse.store import SeriesStore
+
+
+def frame(dates) -> pd.DataFrame:
+    """One weekly series over the given dates"""
+    return pd.DataFrame({
+        'series_name': 'Loans, all commercial banks',
+        'date': dates,
+        'value': range(1, len(dates) + 1),
+        'bank_type': 'all_commercial',
+        'asset_class': 'commercial_industrial',
+        'series_code': 'H8/LOANS',
+    })
+
+
+def publish(db: DatabaseManager, df: pd.DataFrame):
+    """Write rows and record the load the way H8DataLoader does"""
+    db.insert_data(df)
+    db.record_update(len(df), 'success', changes={'H8/LOANS': df['date'].min()})
+
+
+@pytest.fixture
+def store(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'store.db'))
+    db.init_database()
+    publish(db, frame(['2024-01-03', '2024-01-10']))
+    store = SeriesStore(db)
+    store.load()
+    return store
+
+
+def test_store_reloads_after_load_in_other_process(store):
+    """Rows committed through another manager reach the store without a restart"""
+    publish(DatabaseManager(store.db_manager.db_path), frame(['2024-01-17']))
+    assert store.get_data()['date'].tolist() == ['2024-01-03', '2024-01-10', '2024-01-17']
+    assert store.get_latest_date() == '2024-01-17'
+
+
+def test_store_refreshed_by_listener_is_not_reloaded(store, monkeypatch):
+    """An in-process load refreshes the snapshot once, tagged with the published version"""
+    builds = []
+    build = store._build_snapshot
+    monkeypatch.setattr(store, '_build_snapshot', lambda: builds.append(1) or build())
+
+    publish(store.db_manager, frame(['2024-01-17']))
+    assert len(store.get_data()) == 3
+    assert len(builds) == 1